@@ -0,0 +1,94 @@
+import time
+
+import numpy as np
+
+from gridUtils import GridMap, cached_arrays
+from searchUtils import INF, as_grid_map, cost_field
+
+DEFAULT_LANDMARKS = 8
+
+
+class LandmarkTable:
+    """
+    ALT (A*, landmarks, triangle inequality) lower bounds for a cost grid. For every
+    landmark L the table holds the exact cost d(L, v) of reaching each cell v, from
+    cost_field. Reversing a path swaps which end's cost is paid, so
+    d(v, L) = d(L, v) - cost[v] + cost[L] and one table per landmark gives both
+    d(L, goal) - d(L, v) <= d(v, goal) and d(v, L) - d(goal, L) <= d(v, goal).
+    The heuristic is the largest of those bounds and the Manhattan distance; each is
+    consistent, so their maximum is too and A* keeps returning optimal paths.
+    """
+
+    def __init__(self, grid, landmarks, distances, build_times=None):
+        self.grid = grid
+        self.landmarks = landmarks
+        self.distances = distances
+        self.build_times = build_times
+
+    @classmethod
+    def build(cls, grid_costs, count=DEFAULT_LANDMARKS):
+        """
+        Picks 'count' landmarks by farthest selection (the first free cell, then each time
+        the cell farthest from every landmark so far) and computes their tables.
+        """
+        grid = as_grid_map(grid_costs)
+        free = ~grid.blocked.to_array().reshape(-1)
+        landmark = int(np.argmax(free))
+        landmarks, tables, build_times = [], [], []
+        nearest = np.full(grid.size, INF)
+        for _ in range(min(count, int(free.sum()))):
+            started = time.perf_counter()
+            table = np.frombuffer(cost_field(grid, divmod(landmark, grid.cols)), dtype=np.float64)
+            build_times.append(time.perf_counter() - started)
+            landmarks.append(landmark)
+            tables.append(table)
+            # Next landmark: the reachable cell whose nearest landmark is farthest away
+            nearest = np.minimum(nearest, table)
+            candidates = np.where(np.isfinite(nearest), nearest, -1)
+            candidates[landmarks] = -1
+            landmark = int(np.argmax(candidates))
+            if candidates[landmark] <= 0:
+                break
+        distances = np.array(tables).reshape(len(tables), grid.size)
+        return cls(grid, np.array(landmarks, dtype=np.int64), distances, np.array(build_times))
+
+    @classmethod
+    def load(cls, map_path, count=DEFAULT_LANDMARKS):
+        """
+        Memory-maps the .npy cost map at 'map_path' and loads its tables from the cache
+        file next to it, building and saving them first if the cache is missing or was
+        made from a different map file or landmark count.
+        """
+        grid = GridMap.from_npy(map_path)
+        data = cached_arrays(map_path, f"alt{count}", lambda: cls.build(grid, count).arrays(), count=count)
+        return cls(grid, data["landmarks"], data["distances"], data["build_times"])
+
+    def arrays(self):
+        """The tables as named arrays, as stored in the cache file."""
+        return {"landmarks": self.landmarks, "distances": self.distances, "build_times": self.build_times}
+
+    @property
+    def bytes_per_landmark(self):
+        return self.distances.nbytes // max(len(self.landmarks), 1)
+
+    def heuristic(self, goal):
+        """
+        Flat array of lower bounds on the cost from every cell to 'goal', for
+        find_path_a_star's 'heuristic'. Built a landmark at a time in O(cells) memory.
+        """
+        grid = self.grid
+        cols = grid.cols
+        goal_index = goal[0] * cols + goal[1]
+        costs = grid.costs.reshape(-1)
+        rows, columns = np.divmod(np.arange(grid.size), cols)
+        bound = (np.abs(rows - goal[0]) + np.abs(columns - goal[1])).astype(np.float64)
+        # d(v, L) - d(goal, L) = d(L, v) - d(L, goal) - cost[v] + cost[goal]; the subtraction
+        # reads the (possibly memory-mapped, narrower) costs straight into a float64 result
+        reverse_shift = np.subtract(float(costs[goal_index]), costs, dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            for table in self.distances:
+                # d(L, goal) - d(L, v) and d(v, L) - d(goal, L); NaN (both unreachable from L) is skipped by fmax
+                difference = table[goal_index] - table
+                np.fmax(bound, difference, out=bound)
+                np.fmax(bound, reverse_shift - difference, out=bound)
+        return memoryview(bound)
@@ -0,0 +1,123 @@
+import os
+import time
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+import exerciseThree
+from gridUtils import GridMap
+from searchUtils import as_grid_map, find_path_a_star
+
+DEFAULT_CHUNK_SIZE = 256
+
+# Set once per pool process by _attach
+_blocks = []
+_grid = None
+_queries = None
+_search = None
+
+
+class PathBatch:
+    """
+    Paths of a batch of queries in CSR form: path i is cells[offsets[i]:offsets[i + 1]],
+    as flat indices (row * cols + col), and is empty when the goal was unreachable.
+    """
+
+    def __init__(self, cols, offsets, cells, elapsed, workers):
+        self.cols = cols
+        self.offsets = offsets
+        self.cells = cells
+        self.elapsed = elapsed
+        self.workers = workers
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def path(self, i):
+        """Path of query 'i' as a list of (row, col) tuples, or None if it was unreachable."""
+        segment = self.cells[self.offsets[i]:self.offsets[i + 1]]
+        return [divmod(int(cell), self.cols) for cell in segment] if len(segment) else None
+
+    @property
+    def queries_per_second(self):
+        return len(self) / self.elapsed if self.elapsed else float('inf')
+
+
+def _share(values):
+    """New shared memory block holding a copy of the array 'values'."""
+    block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    np.ndarray(values.shape, values.dtype, buffer=block.buf)[...] = values
+    return block
+
+
+def _attach(rows, cols, blocked_name, blocked_count, costs_name, costs_dtype, queries_name, query_count,
+            algorithm, options):
+    """Pool initializer: maps the shared grid and queries into this process without copying them."""
+    global _grid, _queries, _search
+    blocked, costs, queries = (shared_memory.SharedMemory(name=name) for name in (blocked_name, costs_name, queries_name))
+    _blocks.extend((blocked, costs, queries))
+    _grid = GridMap(rows, cols)
+    _grid.blocked.bits = blocked.buf[:len(_grid.blocked.bits)]
+    _grid.blocked.count = blocked_count
+    _grid.costs = np.ndarray((rows, cols), costs_dtype, buffer=costs.buf)
+    _queries = np.ndarray((query_count, 4), np.int64, buffer=queries.buf)
+
+    if algorithm == "a_star":
+        _search = lambda start, goal: find_path_a_star(_grid, start, goal, **options)
+    else:
+        _search = lambda start, goal: exerciseThree.find_path_bfs(start, goal, _grid, **options)
+
+
+def _solve(chunk):
+    """Runs queries [lo, hi); returns (lo, path lengths, their cells back to back)."""
+    lo, hi = chunk
+    cols = _grid.cols
+    lengths = np.zeros(hi - lo, dtype=np.int64)
+    cells = []
+    for i, (start_r, start_c, goal_r, goal_c) in enumerate(_queries[lo:hi].tolist()):
+        path = _search((start_r, start_c), (goal_r, goal_c))
+        if path is not None:
+            lengths[i] = len(path)
+            cells.extend(r * cols + c for r, c in path)
+    return lo, lengths, np.array(cells, dtype=np.int64)
+
+
+def find_paths(grid_costs, queries, algorithm="a_star", workers=None, chunksize=DEFAULT_CHUNK_SIZE, **options):
+    """
+    Solves every (start_row, start_col, goal_row, goal_col) row of 'queries' on
+    'grid_costs' (a GridMap or a 2-D cost array) across a pool of 'workers' processes.
+    algorithm="a_star" runs find_path_a_star and "bfs" runs exerciseThree's
+    find_path_bfs (square grids only); 'options' go to the search (bidirectional=True,
+    backend="jps"...). The grid and the queries are copied into shared memory once and
+    every worker maps them, so tasks only carry query ranges. Returns a PathBatch.
+    """
+    if algorithm not in ("a_star", "bfs"):
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    grid = as_grid_map(grid_costs)
+    if algorithm == "bfs" and grid.rows != grid.cols:
+        raise ValueError("find_path_bfs needs a square grid")
+    queries = np.ascontiguousarray(queries, dtype=np.int64).reshape(-1, 4)
+    costs = np.ones((grid.rows, grid.cols)) if grid.costs is None else np.asarray(grid.costs)
+    workers = workers or os.cpu_count()
+
+    started = time.perf_counter()
+    blocks = [_share(np.frombuffer(grid.blocked.bits, dtype=np.uint8)), _share(costs), _share(queries)]
+    try:
+        chunks = [(lo, min(lo + chunksize, len(queries))) for lo in range(0, len(queries), chunksize)]
+        lengths = np.zeros(len(queries), dtype=np.int64)
+        parts = [None] * len(chunks)
+        initargs = (grid.rows, grid.cols, blocks[0].name, len(grid.blocked), blocks[1].name, costs.dtype,
+                    blocks[2].name, len(queries), algorithm, options)
+        with Pool(workers, initializer=_attach, initargs=initargs) as pool:
+            for lo, chunk_lengths, chunk_cells in pool.imap_unordered(_solve, chunks):
+                lengths[lo:lo + len(chunk_lengths)] = chunk_lengths
+                parts[lo // chunksize] = chunk_cells
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    dtype = np.int32 if grid.size <= np.iinfo(np.int32).max else np.int64
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    cells = np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype=dtype)
+    return PathBatch(grid.cols, offsets, cells, time.perf_counter() - started, workers)
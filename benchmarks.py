@@ -0,0 +1,534 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import lru_cache
+
+import numpy as np
+
+import exerciseThree
+import exerciseTwo
+from altHeuristic import LandmarkTable
+from batchSearch import find_paths
+from gridUtils import CellMask, GridMap
+from hpaStar import DEFAULT_CLUSTER_SIZE, HierarchicalMap
+from searchUtils import (SearchStats, a_star_search, bidirectional_a_star_search, dial_a_star_search,
+                         find_path_a_star, wavefront_field)
+
+
+def random_obstacles(rows, cols, density, rng):
+    """Set of (row, col) obstacles covering about 'density' of the grid."""
+    count = int(rows * cols * density)
+    return {(rng.randrange(rows), rng.randrange(cols)) for _ in range(count)}
+
+
+def random_cost_map(rows, cols, rng, levels=(1, 2, 3), block=4):
+    """Blocky terrain like GRID_COSTS: square patches of 'block' cells, each with a random cost from 'levels'."""
+    seed = rng.randrange(2 ** 32)
+    patches = np.random.default_rng(seed).choice(levels, size=(-(-rows // block), -(-cols // block)))
+    return np.kron(patches, np.ones((block, block)))[:rows, :cols].astype(np.float64)
+
+
+def random_blocks(rows, cols, density, rng):
+    """Rectangular obstacles up to an eighth of the grid wide, until about 'density' of it is covered."""
+    obstacles = set()
+    while len(obstacles) < rows * cols * density:
+        height, width = rng.randint(1, max(1, rows // 8)), rng.randint(1, max(1, cols // 8))
+        top, left = rng.randrange(rows), rng.randrange(cols)
+        obstacles |= {(r, c) for r in range(top, min(rows, top + height)) for c in range(left, min(cols, left + width))}
+    return obstacles
+
+
+def rooms(rows, cols, count=5):
+    """A count x count layout of rooms separated by walls, each wall with one door."""
+    obstacles = set()
+    step = max(1, rows // count)
+    for k in range(0, rows, step):
+        obstacles |= {(k, c) for c in range(cols) if c % step != step // 2}
+        obstacles |= {(r, k) for r in range(rows) if r % step != step // 2}
+    return obstacles
+
+
+def maze(rows, cols, rng):
+    """
+    (rows, cols) boolean wall array of a binary-tree maze: cells on even rows and
+    columns, each opened towards its north or east neighbour, so every cell is
+    connected by exactly one route and corridors run the whole grid.
+    """
+    generator = np.random.default_rng(rng.randrange(2 ** 32))
+    blocked = np.ones((rows, cols), dtype=bool)
+    blocked[::2, ::2] = False
+    north = generator.random(((rows + 1) // 2, (cols + 1) // 2)) < 0.5
+    north[0] = False
+    north[:, -1] = True
+    north[0, -1] = False
+    east = ~north
+    east[:, -1] = False
+    r, c = np.nonzero(north)
+    blocked[2 * r - 1, 2 * c] = False
+    r, c = np.nonzero(east)
+    blocked[2 * r, 2 * c + 1] = False
+    return blocked
+
+
+def generate_map(kind, size, density, rng):
+    """
+    Seeded size x size GridMap for the scaling suite, built with NumPy so 4000x4000
+    maps take seconds: "scattered" obstacles covering about 'density' of the grid,
+    a "maze", or "levels", blocky costs from 1 to 9 with scattered obstacles.
+    """
+    generator = np.random.default_rng(rng.randrange(2 ** 32))
+    costs = np.ones((size, size))
+    if kind == "maze":
+        blocked = maze(size, size, rng)
+    elif kind in ("scattered", "levels"):
+        blocked = generator.random((size, size)) < density
+        if kind == "levels":
+            costs = random_cost_map(size, size, rng, levels=tuple(range(1, 10)))
+    else:
+        raise ValueError(f"Unknown map kind: {kind}")
+    grid = GridMap(size, size, costs=costs)
+    grid.blocked.bits = bytearray(np.packbits(blocked.reshape(-1), bitorder='little').tobytes())
+    grid.blocked.count = int(blocked.sum())
+    return grid
+
+
+def free_pairs(grid, count, rng):
+    """'count' free start/goal pairs at least (rows + cols) // 2 apart, drawn like distant_pair."""
+    free = np.flatnonzero(~grid.blocked.to_array().reshape(-1))
+    min_distance = (grid.rows + grid.cols) // 2
+    pairs = []
+    while len(pairs) < count:
+        start, goal = (grid.cell(int(free[rng.randrange(len(free))])) for _ in range(2))
+        if abs(start[0] - goal[0]) + abs(start[1] - goal[1]) >= min_distance:
+            pairs.append((start, goal))
+    return pairs
+
+
+def distant_pair(rows, cols, obstacles, rng):
+    """Free start/goal at least (rows + cols) // 2 apart, as exerciseFour's generate_distant_nodes draws them."""
+    min_distance = (rows + cols) // 2
+    while True:
+        start = (rng.randrange(rows), rng.randrange(cols))
+        goal = (rng.randrange(rows), rng.randrange(cols))
+        if (start not in obstacles and goal not in obstacles
+                and abs(start[0] - goal[0]) + abs(start[1] - goal[1]) >= min_distance):
+            return start, goal
+
+
+def _run(search, queries):
+    """Runs 'search' over every query; returns (paths, total expansions, seconds)."""
+    paths, expanded = [], 0
+    started = time.perf_counter()
+    for query in queries:
+        path, count = search(*query)
+        paths.append(path)
+        expanded += count
+    return paths, expanded, time.perf_counter() - started
+
+
+def _report(name, baseline, candidate):
+    _, base_expanded, base_time = baseline
+    _, expanded, elapsed = candidate
+    print(f"  {name:<22} expanded {expanded:>10}  ({expanded / max(base_expanded, 1):6.1%})"
+          f"  time {elapsed:7.3f}s  ({elapsed / base_time if base_time else 0:6.1%})")
+
+
+def bench_bidirectional(size, pairs, density, seed):
+    """Expansions and time of the bidirectional searches against their one-sided versions on distant pairs."""
+    rng = random.Random(seed)
+    obstacles = random_obstacles(size, size, density, rng)
+    queries = [distant_pair(size, size, obstacles, rng) for _ in range(pairs)]
+
+    print(f"--- BFS, {size}x{size}, {density:.0%} obstacles, {pairs} distant pairs ---")
+    bfs_queries = [(start, goal, obstacles, size) for start, goal in queries]
+    plain = _run(exerciseThree.find_path_plain_bfs, bfs_queries)
+    bidirectional = _run(exerciseThree.find_path_bidirectional_bfs, bfs_queries)
+    assert [p and len(p) for p in plain[0]] == [p and len(p) for p in bidirectional[0]]
+    _report("plain BFS", plain, plain)
+    _report("bidirectional BFS", plain, bidirectional)
+
+    print(f"--- A*, {size}x{size}, costs 1-3, {density:.0%} obstacles, {pairs} distant pairs ---")
+    grid = GridMap(size, size, obstacles, random_cost_map(size, size, rng))
+    costs = grid.costs
+    a_star_queries = [(grid, start, goal) for start, goal in queries]
+    forward = _run(a_star_search, a_star_queries)
+    bidirectional = _run(bidirectional_a_star_search, a_star_queries)
+
+    def path_cost(path):
+        return None if path is None else sum(costs[cell] for cell in path[1:])
+    assert [path_cost(p) for p in forward[0]] == [path_cost(p) for p in bidirectional[0]]
+    _report("A*", forward, forward)
+    _report("bidirectional A*", forward, bidirectional)
+
+
+def bench_hierarchical(size, pairs, density, seed, cluster_size=DEFAULT_CLUSTER_SIZE):
+    """HPA* on a memory-mapped .npy map: build and cached-load time, query time and cost against A*."""
+    rng = random.Random(seed)
+    costs = random_cost_map(size, size, rng)
+    obstacles = random_obstacles(size, size, density, rng)
+    for row, col in obstacles:
+        costs[row, col] = np.inf
+    queries = [distant_pair(size, size, obstacles, rng) for _ in range(pairs)]
+
+    print(f"--- HPA*, {size}x{size}, costs 1-3, {density:.0%} obstacles, clusters of {cluster_size}, {pairs} distant pairs ---")
+    with tempfile.TemporaryDirectory() as directory:
+        map_path = os.path.join(directory, "costs.npy")
+        np.save(map_path, costs)
+        started = time.perf_counter()
+        HierarchicalMap.load(map_path, cluster_size)
+        build_time = time.perf_counter() - started
+        started = time.perf_counter()
+        hierarchy = HierarchicalMap.load(map_path, cluster_size)
+        load_time = time.perf_counter() - started
+        grid = hierarchy.grid
+
+        def path_cost(path):
+            return None if path is None else sum(float(grid.costs[cell]) for cell in path[1:])
+        started = time.perf_counter()
+        optimal = [path_cost(a_star_search(grid, start, goal)[0]) for start, goal in queries]
+        a_star_time = time.perf_counter() - started
+        started = time.perf_counter()
+        found = [path_cost(hierarchy.find_path(start, goal)) for start, goal in queries]
+        hpa_time = time.perf_counter() - started
+        del hierarchy, grid
+
+    gaps = [cost / best - 1 for cost, best in zip(found, optimal) if best]
+    print(f"  abstraction: build {build_time:.2f}s, cached load {load_time:.3f}s")
+    print(f"  A*   {a_star_time / pairs:8.4f}s per query")
+    print(f"  HPA* {hpa_time / pairs:8.4f}s per query, cost gap mean {np.mean(gaps):.2%}, max {max(gaps):.2%}")
+
+
+def bench_coverage(size, pairs, density, seed):
+    """Redundant steps and planning time of exerciseTwo's exploration policies on scattered, blocky and room maps."""
+    maps = {
+        "scattered": random_obstacles(size, size, density, random.Random(seed)),
+        "blocks": random_blocks(size, size, density, random.Random(seed)),
+        "rooms": rooms(size, size),
+    }
+    print(f"--- coverage, {size}x{size}, {density:.0%} obstacles ---")
+    for name, obstacles in maps.items():
+        grid = GridMap(size, size, obstacles)
+        origin = next(divmod(i, size) for i in range(grid.size) if not grid.blocked.test(i))
+        routes = {}
+        for policy, planner in exerciseTwo.PLANEJADORES.items():
+            started = time.perf_counter()
+            route = planner(origin, grid)
+            routes[policy] = (route, time.perf_counter() - started)
+        assert len({frozenset(route) for route, _ in routes.values()}) == 1
+        print(f"  {name:<10}" + "".join(
+            f"  {policy} {len(route) - len(set(route)):>7} redundant {elapsed:6.2f}s"
+            for policy, (route, elapsed) in routes.items()))
+
+
+def bench_batch(size, pairs, density, seed, workers=None):
+    """Queries per second of find_paths with 1, 2, 4... workers up to the core count, against a plain loop."""
+    rng = random.Random(seed)
+    obstacles = random_obstacles(size, size, density, rng)
+    grid = GridMap(size, size, obstacles, random_cost_map(size, size, rng))
+    queries = [start + goal for start, goal in (distant_pair(size, size, obstacles, rng) for _ in range(pairs))]
+
+    print(f"--- batch A*, {size}x{size}, costs 1-3, {density:.0%} obstacles, {pairs} distant pairs ---")
+    started = time.perf_counter()
+    expected = [find_path_a_star(grid, (sr, sc), (gr, gc)) for sr, sc, gr, gc in queries]
+    serial = pairs / (time.perf_counter() - started)
+    print(f"  loop       {serial:9.1f} queries/s")
+    counts = [1]
+    while counts[-1] * 2 <= (workers or os.cpu_count()):
+        counts.append(counts[-1] * 2)
+    for count in counts:
+        batch = find_paths(grid, queries, workers=count, chunksize=max(1, pairs // (4 * count)))
+        assert [batch.path(i) for i in range(len(batch))] == expected
+        print(f"  {count:>2} workers {batch.queries_per_second:9.1f} queries/s  ({batch.queries_per_second / serial:5.2f}x)")
+
+
+def bench_landmarks(size, pairs, density, seed, counts=(2, 4, 8, 16)):
+    """Expansions and query time of A* with ALT bounds against Manhattan, plus the cost of each landmark table."""
+    rng = random.Random(seed)
+    obstacles = random_obstacles(size, size, density, rng)
+    grid = GridMap(size, size, obstacles, random_cost_map(size, size, rng))
+    queries = [distant_pair(size, size, obstacles, rng) for _ in range(pairs)]
+
+    def path_cost(path):
+        return None if path is None else sum(grid.costs[cell] for cell in path[1:])
+
+    print(f"--- ALT, {size}x{size}, costs 1-3, {density:.0%} obstacles, {pairs} distant pairs ---")
+    manhattan = _run(lambda start, goal: a_star_search(grid, start, goal), queries)
+    _report("Manhattan", manhattan, manhattan)
+    for count in counts:
+        table = LandmarkTable.build(grid, count)
+        alt = _run(lambda start, goal: a_star_search(grid, start, goal, heuristic=table.heuristic(goal)), queries)
+        assert [path_cost(p) for p in manhattan[0]] == [path_cost(p) for p in alt[0]]
+        _report(f"ALT, {len(table.landmarks)} landmarks", manhattan, alt)
+        print(f"  {'':<22} precompute {table.build_times.mean():.3f}s and {table.bytes_per_landmark / 2 ** 20:.2f} MiB per landmark")
+
+
+def bench_buckets(size, pairs, density, seed, level_sets=((1, 2, 3), tuple(range(1, 10)), (1, 16, 64))):
+    """A* on the bucket queue against the heap, on cost maps with small, wider and sparse integer levels."""
+    rng = random.Random(seed)
+    obstacles = random_obstacles(size, size, density, rng)
+    queries = [distant_pair(size, size, obstacles, rng) for _ in range(pairs)]
+    for levels in level_sets:
+        grid = GridMap(size, size, obstacles, random_cost_map(size, size, rng, levels))
+
+        def path_cost(path):
+            return None if path is None else sum(grid.costs[cell] for cell in path[1:])
+
+        print(f"--- bucket queue, {size}x{size}, costs {levels[0]}-{levels[-1]}, {density:.0%} obstacles, {pairs} distant pairs ---")
+        heap = _run(lambda start, goal: a_star_search(grid, start, goal), queries)
+        buckets = _run(lambda start, goal: dial_a_star_search(grid, start, goal), queries)
+        assert [path_cost(p) for p in heap[0]] == [path_cost(p) for p in buckets[0]]
+        _report("heap", heap, heap)
+        _report("buckets", heap, buckets)
+
+
+def bench_wavefront(size, pairs, density, seed):
+    """Distance field time of the NumPy wavefront against the queue BFS, on scattered, blocky and room maps."""
+    rng = random.Random(seed)
+    maps = {"scattered": random_obstacles(size, size, density, rng),
+            "blocks": random_blocks(size, size, density, rng), "rooms": rooms(size, size)}
+    print(f"--- wavefront, {size}x{size}, {density:.0%} obstacles, {pairs} goals per map ---")
+    for name, obstacles in maps.items():
+        key = frozenset(obstacles)
+        goals = [distant_pair(size, size, obstacles, rng)[1] for _ in range(pairs)]
+        grid = GridMap(size, size, key)
+        started = time.perf_counter()
+        queue_fields = [exerciseThree._distance_field.__wrapped__(key, goal, size)[0] for goal in goals]
+        queue_time = time.perf_counter() - started
+        started = time.perf_counter()
+        wave_fields = [wavefront_field(grid, goal) for goal in goals]
+        wave_time = time.perf_counter() - started
+        assert all(np.array_equal(np.asarray(a), b) for a, b in zip(queue_fields, wave_fields))
+        print(f"  {name:<10} queue BFS {queue_time:7.3f}s  wavefront {wave_time:7.3f}s  ({queue_time / wave_time:5.1f}x)")
+
+
+def _exercise_two_bfs(grid):
+    """exerciseTwo.bfs on 'grid' with every cell but the goal already visited, so it searches for the goal."""
+    visited = CellMask(grid.rows, grid.cols)
+    visited.bits = bytearray(b'\xff') * len(visited.bits)
+    visited.count = grid.size
+
+    def search(start, goal, stats):
+        visited.clear(grid.index(goal))
+        path = exerciseTwo.bfs(start, visited, stats, grid)
+        visited.set(grid.index(goal))
+        return path
+    return search
+
+
+@lru_cache(maxsize=1)
+def _obstacle_set(grid):
+    """exerciseThree's frozenset of obstacle tuples for 'grid', shared by the find_path_bfs kernels."""
+    return frozenset(grid.blocked)
+
+
+def _find_path_bfs(backend):
+    def setup(grid):
+        obstacles = _obstacle_set(grid)
+        exerciseThree._grid_map(obstacles, grid.rows)
+
+        def search(start, goal, stats):
+            # Time the field, not a lookup left over from an earlier query
+            exerciseThree._distance_field.cache_clear()
+            exerciseThree._wavefront_field.cache_clear()
+            return exerciseThree.find_path_bfs(start, goal, obstacles, backend, stats, grid.rows)
+        return search
+    return setup
+
+
+def _find_path_a_star(**options):
+    def setup(grid):
+        return lambda start, goal, stats: find_path_a_star(grid, start, goal, stats=stats, **options)
+    return setup
+
+
+# Kernels of the scaling suite: each takes a GridMap and returns search(start, goal, stats)
+KERNELS = {
+    "bfs": _exercise_two_bfs,
+    "find_path_bfs": _find_path_bfs("bfs"),
+    "find_path_bfs[wavefront]": _find_path_bfs("wavefront"),
+    "find_path_bfs[jps]": _find_path_bfs("jps"),
+    "find_path_bfs[bidirectional]": _find_path_bfs("bidirectional"),
+    "find_path_a_star[heap]": _find_path_a_star(backend="heap"),
+    "find_path_a_star[bucket]": _find_path_a_star(backend="bucket"),
+    "find_path_a_star[bidirectional]": _find_path_a_star(bidirectional=True),
+}
+MAP_KINDS = ("scattered", "maze", "levels")
+# Pure-Python kernels take seconds per 1000x1000 query and minutes per 4000x4000 one under
+# tracemalloc: pass --sizes 1000 4000 (and --kernels) explicitly
+SCALING_SIZES = (10, 100, 300)
+SCALING_PAIRS = 5
+SCALING_REPEAT = 5
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks_baseline.json")
+DEFAULT_THRESHOLD = 0.25
+# Kernels whose baseline median query is faster than this are too close to timer noise to gate on
+MIN_QUERY_TIME = 0.001
+
+
+def scaling_map(kind, size, pairs, density, seed):
+    """The seeded map and distant pairs the scaling suite uses for (kind, size): (grid, queries)."""
+    rng = random.Random(f"{seed}/{kind}/{size}")
+    grid = generate_map(kind, size, density, rng)
+    return grid, free_pairs(grid, pairs, rng)
+
+
+def calibrate(loops=200_000):
+    """Time of a fixed pure-Python loop, the yardstick kernel times are compared in across runs and machines."""
+    started = time.perf_counter()
+    total = 0
+    for i in range(loops):
+        total += i & 7
+    return time.perf_counter() - started
+
+
+def measure_kernel(name, grid, queries, repeat=SCALING_REPEAT):
+    """
+    Runs KERNELS[name] over 'queries' 'repeat' times. Each query's time is its median
+    over the runs; 'time' is the mean of those medians and 'spread' the typical
+    interquartile range of a query's runs relative to its median. 'calibration' is the
+    median calibrate() time taken before each run, so a machine that is busier or
+    throttled while this kernel runs is accounted for. Peak traced memory
+    (tracemalloc) comes from one more run, expansions from the first.
+    """
+    search = KERNELS[name](grid)
+    stats = SearchStats()
+    samples = np.zeros((repeat, len(queries)))
+    calibration = []
+    for run in range(repeat):
+        calibration.append(calibrate())
+        for i, (start, goal) in enumerate(queries):
+            started = time.perf_counter()
+            search(start, goal, stats if run == 0 else None)
+            samples[run, i] = time.perf_counter() - started
+    tracemalloc.start()
+    for start, goal in queries:
+        search(start, goal, None)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    low, median, high = np.percentile(samples, [25, 50, 75], axis=0)
+    return {"time": float(median.mean()), "spread": float(np.median((high - low) / median)),
+            "calibration": float(np.median(calibration)), "peak_bytes": peak, "expansions": stats.expansions}
+
+
+def bench_scaling(size, pairs, density, seed, kernels=None, repeat=SCALING_REPEAT):
+    """
+    Median query time, peak traced memory and expansions of every KERNELS entry (see
+    measure_kernel) on each of MAP_KINDS. Returns them keyed by "kernel/map/size".
+    """
+    results = {}
+    for kind in MAP_KINDS:
+        grid, queries = scaling_map(kind, size, pairs, density, seed)
+        print(f"--- scaling, {kind}, {size}x{size}, {pairs} distant pairs x {repeat} runs ---")
+        for name in kernels or KERNELS:
+            result = results[f"{name}/{kind}/{size}"] = measure_kernel(name, grid, queries, repeat)
+            print(f"  {name:<32} median {result['time'] * 1e3:10.3f} ms/query (IQR {result['spread']:5.0%})"
+                  f"  peak {result['peak_bytes'] / 2 ** 20:9.2f} MiB  expanded {result['expansions']:>10}")
+    return results
+
+
+def save_baseline(results, path=DEFAULT_BASELINE):
+    """Writes 'results' to 'path' with the machine they were measured on."""
+    machine = {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+               "processor": platform.processor()}
+    with open(path, 'w') as file:
+        json.dump({"machine": machine, "results": results}, file, indent=2, sort_keys=True)
+
+
+def _exceeds(metric, reference, measured, threshold):
+    """Whether 'measured' grew past 'threshold' over 'reference'; times also get both runs' spread as slack."""
+    if metric == "time":
+        if reference["time"] < MIN_QUERY_TIME:
+            return False
+        slack = threshold + reference.get("spread", 0.0) + measured.get("spread", 0.0)
+        return measured["time"] > reference["time"] * (1 + slack)
+    return measured[metric] > reference[metric] * (1 + threshold)
+
+
+def compare_baseline(results, path=DEFAULT_BASELINE, threshold=DEFAULT_THRESHOLD, remeasure=None):
+    """
+    Compares 'results' with the baseline at 'path' and prints every metric that grew by
+    more than 'threshold' (0.25 = 25%). Baseline times are first scaled by how much
+    slower calibrate() ran next to the kernel now than when it was stored, are skipped
+    below MIN_QUERY_TIME and get the interquartile spread of both runs as extra slack.
+    A kernel whose time still looks slower is measured again with remeasure(key), if
+    given, and only flagged if the new run agrees. Entries missing from either side are
+    skipped. Returns the regressions as (key, metric, baseline, measured) tuples.
+    """
+    with open(path) as file:
+        stored = json.load(file)
+    baseline = stored["results"]
+
+    def scaled(reference, measured):
+        reference = dict(reference)
+        if reference.get("calibration") and measured.get("calibration"):
+            reference["time"] *= measured["calibration"] / reference["calibration"]
+        return reference
+
+    regressions = []
+    for key in sorted(results.keys() & baseline.keys()):
+        measured = results[key]
+        for metric in ("time", "peak_bytes", "expansions"):
+            reference = scaled(baseline[key], measured)
+            if metric not in reference or not _exceeds(metric, reference, measured, threshold):
+                continue
+            if metric == "time" and remeasure is not None:
+                measured = results[key] = remeasure(key)
+                reference = scaled(baseline[key], measured)
+                if not _exceeds(metric, reference, measured, threshold):
+                    continue
+            regressions.append((key, metric, reference[metric], measured[metric]))
+    print(f"--- baseline {path}: {len(results.keys() & baseline.keys())} of {len(results)} results compared ---")
+    for key, metric, reference, measured in regressions:
+        change = f"{measured / reference - 1:+.0%}" if reference else "new"
+        print(f"  REGRESSION {key} {metric}: {reference:.6g} -> {measured:.6g} ({change})")
+    return regressions
+
+
+BENCHMARKS = {"bidirectional": bench_bidirectional, "hpa": bench_hierarchical, "coverage": bench_coverage,
+              "batch": bench_batch, "landmarks": bench_landmarks,
+              "buckets": bench_buckets, "wavefront": bench_wavefront,
+              "scaling": bench_scaling}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search benchmarks on seeded random maps")
+    parser.add_argument("benchmark", choices=list(BENCHMARKS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=None,
+                        help=f"grid sides (default 100 300, {' '.join(map(str, SCALING_SIZES))} for scaling)")
+    parser.add_argument("--pairs", type=int, default=None, help=f"queries per map (default 20, {SCALING_PAIRS} for scaling)")
+    parser.add_argument("--density", type=float, default=0.2, help="fraction of cells that are obstacles")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kernels", nargs="+", choices=list(KERNELS), default=None, metavar="KERNEL",
+                        help=f"scaling: kernels to run, from {', '.join(KERNELS)}")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="scaling: baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="scaling: fail when a metric grows by more than this fraction of its baseline")
+    parser.add_argument("--repeat", type=int, default=SCALING_REPEAT, help="scaling: runs over each map's pairs")
+    parser.add_argument("--update-baseline", action="store_true", help="scaling: write the results as the new baseline")
+    args = parser.parse_args()
+    if args.benchmark != "scaling":
+        for size in args.sizes or [100, 300]:
+            BENCHMARKS[args.benchmark](size, args.pairs or 20, args.density, args.seed)
+        sys.exit()
+
+    pairs = args.pairs or SCALING_PAIRS
+    results = {}
+    for size in args.sizes or SCALING_SIZES:
+        results.update(bench_scaling(size, pairs, args.density, args.seed, args.kernels, args.repeat))
+
+    def remeasure(key):
+        name, kind, size = key.rsplit("/", 2)
+        grid, queries = scaling_map(kind, int(size), pairs, args.density, args.seed)
+        return measure_kernel(name, grid, queries, 2 * args.repeat)
+    if args.update_baseline:
+        save_baseline(results, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+    elif not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to store one")
+    elif compare_baseline(results, args.baseline, args.threshold, remeasure):
+        sys.exit(1)
@@ -1,11 +1,20 @@
-import heapq
-import matplotlib.pyplot as plt
 import numpy as np
 import random
+from functools import lru_cache
+from altHeuristic import LandmarkTable
+from gridUtils import GridMap
+from hpaStar import DEFAULT_CLUSTER_SIZE, HierarchicalMap
+from renderUtils import BackgroundRenderer
+from robotUtils import FrameRecorder, parse_run_args
+from searchUtils import SearchStats, find_path_a_star
 
 ROWS, COLS = 11, 10
 DIRECTIONS = [(0, 1), (1, 0), (0, -1), (-1, 0)]
 
+# Palette codes: 0 unknown terrain, 1-3 terrain cost, then path/robot/start/goal
+PALETTE = ['#FFFFFF', '#2d6a4f', '#fca311', '#b21807', '#a2d2ff', '#0077b6', '#52b788', '#e5383b']
+PATH, ROBOT, START, GOAL = 4, 5, 6, 7
+
 GRID_COSTS = np.array([
     [1, 1, 1, 1, 1, 1, 1, 1, 1, 1], [1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
     [1, 1, 1, 1, 1, 3, 1, 1, 1, 1], [1, 1, 2, 2, 1, 3, 3, 2, 1, 1],
@@ -14,90 +23,104 @@ GRID_COSTS = np.array([
     [1, 1, 1, 1, 1, 1, 1, 1, 1, 1], [1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
     [1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
 ])
+GRID = GridMap.from_costs(GRID_COSTS)
 
 def heuristic(a, b):
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
-def generate_distant_nodes():
-    """Generates random start and goal nodes that are far apart."""
+def generate_distant_nodes(rng=random, rows=ROWS, cols=COLS):
+    """Generates random start and goal nodes that are far apart, drawing from 'rng'."""
     while True:
-        start_node = (random.randint(0, ROWS - 1), random.randint(0, COLS - 1))
-        goal_node = (random.randint(0, ROWS - 1), random.randint(0, COLS - 1))
-        min_distance = (ROWS + COLS) // 2
+        start_node = (rng.randint(0, rows - 1), rng.randint(0, cols - 1))
+        goal_node = (rng.randint(0, rows - 1), rng.randint(0, cols - 1))
+        min_distance = (rows + cols) // 2
         if start_node != goal_node and heuristic(start_node, goal_node) >= min_distance:
             return start_node, goal_node
 
-def find_path_a_star(grid_costs, start, goal):
-    open_set = []
-    heapq.heappush(open_set, (0, start))
-    came_from = {}
-    g_score = { (r, c): float('inf') for r in range(ROWS) for c in range(COLS) }
-    g_score[start] = 0
-    f_score = { (r, c): float('inf') for r in range(ROWS) for c in range(COLS) }
-    f_score[start] = heuristic(start, goal)
-    while open_set:
-        _, current = heapq.heappop(open_set)
-        if current == goal:
-            path = []
-            while current in came_from:
-                path.append(current)
-                current = came_from[current]
-            path.append(start)
-            return path[::-1]
-        for dr, dc in DIRECTIONS:
-            neighbor = (current[0] + dr, current[1] + dc)
-            if not (0 <= neighbor[0] < ROWS and 0 <= neighbor[1] < COLS):
-                continue
-            move_cost = grid_costs[neighbor[0], neighbor[1]]
-            tentative_g_score = g_score[current] + move_cost
-            if tentative_g_score < g_score[neighbor]:
-                came_from[neighbor] = current
-                g_score[neighbor] = tentative_g_score
-                f_score[neighbor] = tentative_g_score + heuristic(neighbor, goal)
-                heapq.heappush(open_set, (f_score[neighbor], neighbor))
-    return None
+@lru_cache(maxsize=None)
+def landmark_table(count):
+    """ALT tables for GRID_COSTS, built once per landmark count."""
+    return LandmarkTable.build(GRID, count)
 
 def animate_path(path, grid_costs, start_node, goal_node):
-    plt.figure(figsize=(7, 8))
-    terrain_colors = {1: '#2d6a4f', 2: '#fca311', 3: '#b21807'}
-    path_color, robot_color, start_color, goal_color = '#a2d2ff', '#0077b6', '#52b788', '#e5383b'
+    codes = np.where(np.isin(grid_costs, (1, 2, 3)), grid_costs, 0)
+    renderer = BackgroundRenderer(codes, PALETTE, PATH, "Utility-Based Agent in Action (A* Search)", figsize=(7, 8),
+                                  pause=0.25, maxsize=len(path) + 1)
+    renderer.push({"start": (start_node, START), "goal": (goal_node, GOAL)})
+    previous = None
     for position in path:
-        color_grid = np.zeros((ROWS, COLS, 3))
-        for r in range(ROWS):
-            for c in range(COLS):
-                hex_color = terrain_colors.get(grid_costs[r, c], '#FFFFFF').lstrip('#')
-                color_grid[r, c] = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-        for r, c in path:
-            if (r, c) == position: break
-            hex_color = path_color.lstrip('#')
-            color_grid[r, c] = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-        hex_start = start_color.lstrip('#')
-        color_grid[start_node] = tuple(int(hex_start[i:i+2], 16) for i in (0, 2, 4))
-        hex_goal = goal_color.lstrip('#')
-        color_grid[goal_node] = tuple(int(hex_goal[i:i+2], 16) for i in (0, 2, 4))
-        hex_robot = robot_color.lstrip('#')
-        color_grid[position] = tuple(int(hex_robot[i:i+2], 16) for i in (0, 2, 4))
-        plt.imshow((color_grid / 255.0))
-        plt.title("Utility-Based Agent in Action (A* Search)")
-        plt.grid(True, which='both', color='k', linewidth=0.5)
-        plt.xticks(np.arange(-.5, COLS, 1), [])
-        plt.yticks(np.arange(-.5, ROWS, 1), [])
-        plt.pause(0.25)
-    plt.title("Path Complete! Close the window to finish.")
-    plt.show()
+        renderer.push({"robot": (position, ROBOT)}, trail=[] if previous is None else [previous])
+        previous = position
+    renderer.close("Path Complete! Close the window to finish.")
 
-if __name__ == "__main__":
-    start_node, goal_node = generate_distant_nodes()
+def run_stage(headless=False, seed=None, frames=None, stats=None, landmarks=0):
+    """
+    Plans the minimum cost path on GRID_COSTS and animates it.
+    'seed' makes the start/goal draw reproducible, 'headless' skips the animation,
+    'frames' saves every step to a .npz file and 'stats' (a SearchStats) collects
+    the search counters. With 'landmarks' A* is guided by the ALT bounds of that
+    many landmarks instead of the Manhattan distance. Returns the evaluation metrics.
+    """
+    start_node, goal_node = generate_distant_nodes(random.Random(seed))
     print("--- Stage 4: Fully Observable Environment ---")
     print(f"Objective: Find the minimum cost path from {start_node} to {goal_node}")
-    found_path = find_path_a_star(GRID_COSTS, start_node, goal_node)
+    heuristic = landmark_table(landmarks).heuristic(goal_node) if landmarks else None
+    found_path = find_path_a_star(GRID, start_node, goal_node, stats=stats, heuristic=heuristic)
     if found_path:
         total_cost = sum(GRID_COSTS[r, c] for r, c in found_path[1:])
         print(f"✅ Path found!")
         print(f"  - Task Success: Yes")
         print(f"  - Total Path Cost: {total_cost}")
-        print("\nStarting animation...")
-        animate_path(found_path, GRID_COSTS, start_node, goal_node)
-        print("Animation finished.")
+        if frames:
+            recorder = FrameRecorder(GRID_COSTS)
+            for position in found_path:
+                recorder.record(position)
+            recorder.save(frames)
+        if not headless:
+            print("\nStarting animation...")
+            animate_path(found_path, GRID_COSTS, start_node, goal_node)
+            print("Animation finished.")
+        return {"success": True, "total_cost": int(total_cost), "path_length": len(found_path) - 1}
+    print(f"❌ Could not find a path.")
+    return {"success": False, "total_cost": None, "path_length": None}
+
+def run_map_stage(map_path, seed=None, cluster_size=DEFAULT_CLUSTER_SIZE):
+    """
+    Plans between distant nodes on a .npy cost map with HPA*. The map is memory-mapped
+    and its abstraction is loaded from (or built and saved to) a cache file next to it.
+    Large maps are never animated. Returns the same metrics as run_stage.
+    """
+    hierarchy = HierarchicalMap.load(map_path, cluster_size)
+    grid = hierarchy.grid
+    rng = random.Random(seed)
+    while True:
+        start_node, goal_node = generate_distant_nodes(rng, grid.rows, grid.cols)
+        if grid.is_free(start_node) and grid.is_free(goal_node):
+            break
+    print(f"--- Stage 4: {map_path} ({grid.rows}x{grid.cols}, {len(hierarchy.nodes)} transitions) ---")
+    print(f"Objective: Find the minimum cost path from {start_node} to {goal_node}")
+    found_path = hierarchy.find_path(start_node, goal_node)
+    if found_path:
+        total_cost = sum(grid.costs[r, c] for r, c in found_path[1:])
+        print(f"✅ Path found!")
+        print(f"  - Task Success: Yes")
+        print(f"  - Total Path Cost: {total_cost}")
+        return {"success": True, "total_cost": int(total_cost), "path_length": len(found_path) - 1}
+    print(f"❌ Could not find a path.")
+    return {"success": False, "total_cost": None, "path_length": None}
+
+def map_options(parser):
+    parser.add_argument("--map", default=None, help="plan on this .npy cost map with HPA* instead of GRID_COSTS")
+    parser.add_argument("--cluster-size", type=int, default=DEFAULT_CLUSTER_SIZE, help="HPA* cluster side, in cells")
+    parser.add_argument("--stats", default=None, help="write the A* search counters to this JSON file")
+    parser.add_argument("--landmarks", type=int, default=0, help="guide A* with ALT bounds from this many landmarks")
+
+if __name__ == "__main__":
+    args = parse_run_args("Utility-based agent (A*) in a fully observable environment", extra=map_options)
+    if args.map:
+        run_map_stage(args.map, seed=args.seed, cluster_size=args.cluster_size)
     else:
-        print(f"❌ Could not find a path.")
\ No newline at end of file
+        stats = SearchStats() if args.stats else None
+        run_stage(headless=args.headless, seed=args.seed, frames=args.frames, stats=stats, landmarks=args.landmarks)
+        if stats:
+            stats.to_json(args.stats)
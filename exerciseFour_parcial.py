@@ -1,10 +1,18 @@
 import heapq
-import matplotlib.pyplot as plt
+from array import array
 import numpy as np
 import random
+from gridUtils import GridMap
+from renderUtils import BackgroundRenderer
+from robotUtils import FrameRecorder, parse_run_args
 
 ROWS, COLS = 11, 10
 DIRECTIONS = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+INF = float('inf')
+
+# Palette codes: 0 unknown terrain, 1-3 terrain cost, then path/robot/start/goal
+PALETTE = ['#cccccc', '#2d6a4f', '#fca311', '#b21807', '#a2d2ff', '#0077b6', '#52b788', '#e5383b']
+PATH, ROBOT, START, GOAL = 4, 5, 6, 7
 
 REAL_GRID_COSTS = np.array([
     [1, 1, 1, 1, 1, 1, 1, 1, 1, 1], [1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
@@ -14,110 +22,253 @@ REAL_GRID_COSTS = np.array([
     [1, 1, 1, 1, 1, 1, 1, 1, 1, 1], [1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
     [1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
 ])
+REAL_GRID = GridMap.from_costs(REAL_GRID_COSTS)
+# With line of sight on, terrain this costly (the ridge) hides the cells behind it
+OCCLUDING_COST = 3
 
 def heuristic(a, b):
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
-def generate_distant_nodes():
-    """Generates random start and goal nodes that are far apart."""
+def generate_distant_nodes(rng=random):
+    """Generates random start and goal nodes that are far apart, drawing from 'rng'."""
     while True:
-        start_node = (random.randint(0, ROWS - 1), random.randint(0, COLS - 1))
-        goal_node = (random.randint(0, ROWS - 1), random.randint(0, COLS - 1))
+        start_node = (rng.randint(0, ROWS - 1), rng.randint(0, COLS - 1))
+        goal_node = (rng.randint(0, ROWS - 1), rng.randint(0, COLS - 1))
         min_distance = (ROWS + COLS) // 2
         if start_node != goal_node and heuristic(start_node, goal_node) >= min_distance:
             return start_node, goal_node
 
-def find_path_a_star(known_costs, start, goal):
-    open_set = []
-    heapq.heappush(open_set, (0, start))
-    came_from = {}
-    g_score = { (r, c): float('inf') for r in range(ROWS) for c in range(COLS) }
-    g_score[start] = 0
-    f_score = { (r, c): float('inf') for r in range(ROWS) for c in range(COLS) }
-    f_score[start] = heuristic(start, goal)
-    while open_set:
-        _, current = heapq.heappop(open_set)
-        if current == goal:
-            path = []
-            while current in came_from:
-                path.append(current)
-                current = came_from[current]
-            path.append(start)
-            return path[::-1]
-        for dr, dc in DIRECTIONS:
-            neighbor = (current[0] + dr, current[1] + dc)
-            if not (0 <= neighbor[0] < ROWS and 0 <= neighbor[1] < COLS): continue
-            move_cost = known_costs[neighbor[0], neighbor[1]]
-            tentative_g_score = g_score[current] + move_cost
-            if tentative_g_score < g_score[neighbor]:
-                came_from[neighbor] = current
-                g_score[neighbor] = tentative_g_score
-                f_score[neighbor] = tentative_g_score + heuristic(neighbor, goal)
-                heapq.heappush(open_set, (f_score[neighbor], neighbor))
-    return None
-
-def animate_partial_view(agent_pos, known_costs, path_taken, start_node, goal_node):
-    terrain_colors = {0: '#cccccc', 1: '#2d6a4f', 2: '#fca311', 3: '#b21807'}
-    path_color, robot_color, start_color, goal_color = '#a2d2ff', '#0077b6', '#52b788', '#e5383b'
-    color_grid = np.zeros((ROWS, COLS, 3))
-    for r in range(ROWS):
-        for c in range(COLS):
-            hex_color = terrain_colors.get(known_costs[r, c], '#FFFFFF').lstrip('#')
-            color_grid[r, c] = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-    for r, c in path_taken:
-        hex_color = path_color.lstrip('#')
-        color_grid[r, c] = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-    hex_start = start_color.lstrip('#')
-    color_grid[start_node] = tuple(int(hex_start[i:i+2], 16) for i in (0, 2, 4))
-    hex_goal = goal_color.lstrip('#')
-    color_grid[goal_node] = tuple(int(hex_goal[i:i+2], 16) for i in (0, 2, 4))
-    hex_robot = robot_color.lstrip('#')
-    color_grid[agent_pos] = tuple(int(hex_robot[i:i+2], 16) for i in (0, 2, 4))
-    plt.imshow((color_grid / 255.0))
-    plt.title("Partially Observable Environment")
-    plt.grid(True, which='both', color='k', linewidth=0.5)
-    plt.xticks(np.arange(-.5, COLS, 1), [])
-    plt.yticks(np.arange(-.5, ROWS, 1), [])
-    plt.pause(0.25)
+class DStarLite:
+    """
+    Incremental planner (D* Lite) for the partially observable agent.
+    Searches backwards from the goal and keeps g/rhs values between replans,
+    so only the vertices affected by newly sensed costs are repaired.
+    Cells are flat indices into a GridMap and g/rhs live in flat arrays.
+    """
 
-if __name__ == "__main__":
-    start_node, goal_node = generate_distant_nodes()
+    def __init__(self, plan_costs, start, goal):
+        self.grid = GridMap.from_costs(np.array(plan_costs, dtype=np.float64))
+        self.costs = self.grid.flat_costs()
+        self.cols = self.grid.cols
+        self.start = start
+        self.goal = goal
+        self.start_index = self.grid.index(start)
+        self.goal_index = self.grid.index(goal)
+        self.km = 0
+        self.g = array('d', [INF]) * self.grid.size
+        self.rhs = array('d', [INF]) * self.grid.size
+        self.rhs[self.goal_index] = 0
+        self.open_set = []
+        self.open_keys = {}
+        self.touched = 0
+        self._push(self.goal_index)
+
+    def _key(self, node):
+        best = min(self.g[node], self.rhs[node])
+        h = abs(node // self.cols - self.start[0]) + abs(node % self.cols - self.start[1])
+        return (best + h + self.km, best)
+
+    def _push(self, node):
+        key = self._key(node)
+        self.open_keys[node] = key
+        heapq.heappush(self.open_set, (key, node))
+
+    def _top(self):
+        while self.open_set:
+            key, node = self.open_set[0]
+            if self.open_keys.get(node) == key:
+                return key, node
+            heapq.heappop(self.open_set)
+        return (INF, INF), None
+
+    def _update_vertex(self, node):
+        if node != self.goal_index:
+            self.rhs[node] = min(self.costs[n] + self.g[n] for n in self.grid.neighbors(node))
+        self.open_keys.pop(node, None)
+        if self.g[node] != self.rhs[node]:
+            self._push(node)
+
+    def _compute_shortest_path(self):
+        touched = 0
+        start = self.start_index
+        while True:
+            k_old, node = self._top()
+            if node is None:
+                break
+            if not (k_old < self._key(start) or self.rhs[start] != self.g[start]):
+                break
+            k_new = self._key(node)
+            if k_old < k_new:
+                self._push(node)
+                continue
+            heapq.heappop(self.open_set)
+            del self.open_keys[node]
+            touched += 1
+            if self.g[node] > self.rhs[node]:
+                self.g[node] = self.rhs[node]
+            else:
+                self.g[node] = INF
+                self._update_vertex(node)
+            for pred in self.grid.neighbors(node):
+                self._update_vertex(pred)
+        return touched
+
+    def update(self, start, changed_costs):
+        """Moves the search start to 'start' and applies the {cell: cost} changes that were sensed."""
+        if start != self.start:
+            self.km += heuristic(self.start, start)
+            self.start = start
+            self.start_index = self.grid.index(start)
+        for cell, cost in changed_costs.items():
+            index = self.grid.index(cell)
+            if self.costs[index] == cost:
+                continue
+            self.costs[index] = cost
+            for pred in self.grid.neighbors(index):
+                self._update_vertex(pred)
+
+    def find_path(self):
+        """
+        Repairs the search and returns the path from the current start to the goal,
+        or None if it is unreachable. 'touched' holds the vertices expanded by this replan.
+        """
+        self.touched = self._compute_shortest_path()
+        if self.g[self.start_index] == INF:
+            return None
+        path = [self.start]
+        current = self.start_index
+        while current != self.goal_index:
+            current = min(self.grid.neighbors(current), key=lambda n: self.costs[n] + self.g[n])
+            path.append(self.grid.cell(current))
+        return path
+
+class Sensor:
+    """
+    What the agent sees from a cell: every cell within Manhattan distance 'radius'
+    (radius 1 is the cell plus its four neighbours) and, with 'line_of_sight', only
+    those whose straight line from the agent crosses no cell costing OCCLUDING_COST
+    or more. The footprint offsets and the cells along each line are worked out once;
+    a reading gathers just the footprint out of padded copies of the real map, so
+    its cost depends on the radius, not on the grid size.
+    """
+
+    def __init__(self, real_costs, radius=1, line_of_sight=False):
+        self.real = np.asarray(real_costs)
+        self.radius = radius
+        rows, cols = self.real.shape
+        self.inside = np.pad(np.ones((rows, cols), dtype=bool), radius)
+        self.opaque = np.pad(self.real >= OCCLUDING_COST, radius)
+
+        dr, dc = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+        self.offsets = np.argwhere(np.abs(dr) + np.abs(dc) <= radius) - radius
+        self.lines = None
+        if line_of_sight:
+            # Cells strictly between the agent and each offset, padded with the agent's own cell
+            span = max(1, 2 * radius)
+            lines = np.zeros((len(self.offsets), span - 1, 2), dtype=np.intp)
+            valid = np.zeros((len(self.offsets), span - 1), dtype=bool)
+            for k, (r, c) in enumerate(self.offsets):
+                steps = max(abs(r), abs(c))
+                for i in range(1, steps):
+                    lines[k, i - 1] = round(r * i / steps), round(c * i / steps)
+                    valid[k, i - 1] = True
+            self.lines, self.line_valid = lines, valid
+
+    def sense(self, position, known_costs):
+        """
+        Copies the visible real costs around 'position' into 'known_costs' in place and
+        returns {(row, col): cost} for the cells whose known cost actually changed.
+        """
+        row, col = position[0] + self.radius, position[1] + self.radius
+        rows, cols = row + self.offsets[:, 0], col + self.offsets[:, 1]
+        visible = self.inside[rows, cols]
+        if self.lines is not None:
+            hidden = self.opaque[row + self.lines[..., 0], col + self.lines[..., 1]] & self.line_valid
+            visible &= ~hidden.any(axis=1)
+        rows, cols = rows[visible] - self.radius, cols[visible] - self.radius
+        changed = known_costs[rows, cols] != self.real[rows, cols]
+        rows, cols = rows[changed], cols[changed]
+        known_costs[rows, cols] = self.real[rows, cols]
+        return {(int(r), int(c)): int(cost) for r, c, cost in zip(rows, cols, self.real[rows, cols])}
+
+def create_partial_view(start_node, goal_node):
+    renderer = BackgroundRenderer(np.zeros((ROWS, COLS), dtype=int), PALETTE, PATH, "Partially Observable Environment",
+                                  figsize=(7, 8), pause=0.25)
+    renderer.push({"start": (start_node, START), "goal": (goal_node, GOAL), "robot": (start_node, ROBOT)})
+    return renderer
+
+def animate_partial_view(renderer, agent_pos, previous_pos, sensed_costs):
+    renderer.push({"robot": (agent_pos, ROBOT)}, trail=[previous_pos, agent_pos], terrain=sensed_costs.items())
+
+def run_stage(headless=False, seed=None, frames=None, sensor_radius=1, line_of_sight=False):
+    """
+    Walks from start to goal sensing only the cells a Sensor of 'sensor_radius' sees
+    (optionally blocked by 'line_of_sight') and replanning every step.
+    'seed' makes the start/goal draw reproducible, 'headless' skips the animation
+    and 'frames' saves every step to a .npz file. Returns the evaluation metrics.
+    """
+    start_node, goal_node = generate_distant_nodes(random.Random(seed))
     
     known_grid_costs = np.zeros((ROWS, COLS), dtype=int)
     agent_pos = start_node
     path_taken = [agent_pos]
     total_cost_incurred = 0
+    planner = DStarLite(np.ones((ROWS, COLS), dtype=int), agent_pos, goal_node)
+    sensor = Sensor(REAL_GRID_COSTS, sensor_radius, line_of_sight)
+    nodes_touched = []
+    recorder = FrameRecorder(known_grid_costs) if frames else None
     
-    plt.figure(figsize=(7, 8))
+    if not headless:
+        renderer = create_partial_view(start_node, goal_node)
     print("--- Stage 4: Partially Observable Environment ---")
     print(f"Objective: Find a path from {start_node} to {goal_node} with limited knowledge.")
 
     while agent_pos != goal_node:
-        for dr, dc in DIRECTIONS + [(0,0)]:
-            r, c = agent_pos[0] + dr, agent_pos[1] + dc
-            if 0 <= r < ROWS and 0 <= c < COLS:
-                known_grid_costs[r, c] = REAL_GRID_COSTS[r, c]
-        
-        plan_costs = np.where(known_grid_costs == 0, 1, known_grid_costs)
-        planned_path = find_path_a_star(plan_costs, agent_pos, goal_node)
+        changed_costs = sensor.sense(agent_pos, known_grid_costs)
+        planner.update(agent_pos, changed_costs)
+        planned_path = planner.find_path()
+        nodes_touched.append(planner.touched)
 
         if planned_path is None or len(planned_path) < 2:
             print("❌ Agent is trapped or cannot find a path based on current knowledge.")
             break
         
+        previous_pos = agent_pos
         next_step = planned_path[1]
         agent_pos = next_step
         path_taken.append(agent_pos)
         total_cost_incurred += REAL_GRID_COSTS[agent_pos]
         
-        animate_partial_view(agent_pos, known_grid_costs, path_taken, start_node, goal_node)
+        if recorder:
+            recorder.record(agent_pos, changed_costs.items())
+        if not headless:
+            animate_partial_view(renderer, agent_pos, previous_pos, changed_costs)
 
-    plt.title("Exploration Complete! Close window to finish.")
-    plt.show()
+    if not headless:
+        renderer.close("Exploration Complete! Close window to finish.")
+    if recorder:
+        recorder.save(frames)
 
     if agent_pos == goal_node:
         print("\n✅ Goal reached!")
         print(f"  - Task Success: Yes")
         print(f"  - Total Path Cost: {total_cost_incurred}")
+        print(f"  - Replans: {len(nodes_touched)} (avg. {sum(nodes_touched) / len(nodes_touched):.1f} nodes touched, max {max(nodes_touched)})")
     else:
-        print("\n❌ Goal not reached.")
\ No newline at end of file
+        print("\n❌ Goal not reached.")
+    return {
+        "success": agent_pos == goal_node,
+        "total_cost": int(total_cost_incurred),
+        "steps": len(path_taken) - 1,
+        "nodes_touched": nodes_touched,
+    }
+
+def sensor_options(parser):
+    parser.add_argument("--sensor-radius", type=int, default=1, help="how far the agent sees, in Manhattan distance")
+    parser.add_argument("--line-of-sight", action="store_true",
+                        help=f"cells behind terrain of cost {OCCLUDING_COST} or more stay unknown")
+
+if __name__ == "__main__":
+    args = parse_run_args("Utility-based agent in a partially observable environment", extra=sensor_options)
+    run_stage(headless=args.headless, seed=args.seed, frames=args.frames,
+              sensor_radius=args.sensor_radius, line_of_sight=args.line_of_sight)
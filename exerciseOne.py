@@ -1,10 +1,13 @@
 import numpy as np
-import matplotlib.pyplot as plt
 from enum import Enum
 import time
+from gridUtils import CellMask
+from renderUtils import BackgroundRenderer
+from robotUtils import FrameRecorder, TerminalRenderer, parse_run_args
 
 # Parâmetros do grid
 N = 10  # tamanho do grid (NxN)
+TAMANHO_MAXIMO_DESENHO = 1000  # janela, terminal e frames guardam o grid inteiro
 
 class Direction(Enum):
     NORTH = 0
@@ -12,22 +15,26 @@ class Direction(Enum):
     SOUTH = 2
     WEST = 3
 
+# Cores da janela: célula livre, visitada e robô
+CORES = ['#f7fbff', '#6baed6', '#08306b']
+VISITADA, ROBO = 1, 2
+
+# Deslocamento (dx, dy) de cada direção, indexado por Direction.value
+PASSOS = [(0, -1), (1, 0), (0, 1), (-1, 0)]
+
 class Grid:
+    __slots__ = ('size',)
+
     def __init__(self, size):
         self.size = size
 
     def has_wall(self, x, y, direction: Direction) -> bool:
-        if direction == Direction.NORTH:
-            return y == 0
-        elif direction == Direction.SOUTH:
-            return y == self.size - 1
-        elif direction == Direction.WEST:
-            return x == 0
-        elif direction == Direction.EAST:
-            return x == self.size - 1
+        dx, dy = PASSOS[direction.value]
+        return not (0 <= x + dx < self.size and 0 <= y + dy < self.size)
 
 class Agent:
-    def __init__(self, start_x, start_y, direction=Direction.NORTH):
+    def __init__(self, start_x, start_y, direction=Direction.NORTH, size=N):
+        self.size = size
         self.x = start_x
         self.y = start_y
         self.direction = direction
@@ -38,7 +45,20 @@ class Agent:
         self.hit_west = False
         self.hit_east = False
 
-        self.visitadas = set()  # posições visitadas (para visualização)
+        self._visitadas = None
+        # Trechos (x0, y0, x1, y1) percorridos em modo avancar_ate_parede
+        self.segmentos = []
+
+    @property
+    def visitadas(self):
+        """
+        Posições (x, y) visitadas (para visualização), um bit por célula; 'in',
+        len e iteração funcionam como no set de antes. Só é alocada no primeiro
+        acesso, então o modo avancar_ate_parede não paga por ela em grids enormes.
+        """
+        if self._visitadas is None:
+            self._visitadas = CellMask(self.size, self.size)
+        return self._visitadas
 
     def has_discovered_all_walls(self) -> bool:
         return self.hit_north and self.hit_south and self.hit_west and self.hit_east
@@ -51,14 +71,33 @@ class Agent:
             self._mark_wall_touched()
             self._turn_right()
         else:
-            if self.direction == Direction.NORTH:
-                self.y -= 1
-            elif self.direction == Direction.SOUTH:
-                self.y += 1
-            elif self.direction == Direction.WEST:
-                self.x -= 1
-            elif self.direction == Direction.EAST:
-                self.x += 1
+            dx, dy = PASSOS[self.direction.value]
+            self.x += dx
+            self.y += dy
+
+    def avancar_ate_parede(self, grid: Grid) -> int:
+        """
+        Equivale a chamar move até a próxima batida na parede: anda em linha reta
+        até a parede em O(1), guarda o trecho como um segmento em vez de célula por
+        célula, bate e vira. Retorna quantas chamadas de move isso representa.
+        """
+        dx, dy = PASSOS[self.direction.value]
+        if dx > 0:
+            distancia = grid.size - 1 - self.x
+        elif dx < 0:
+            distancia = self.x
+        elif dy > 0:
+            distancia = grid.size - 1 - self.y
+        else:
+            distancia = self.y
+
+        x0, y0 = self.x, self.y
+        self.x += dx * distancia
+        self.y += dy * distancia
+        self.segmentos.append((x0, y0, self.x, self.y))
+        self._mark_wall_touched()
+        self._turn_right()
+        return distancia + 1
 
     def _mark_wall_touched(self):
         if self.direction == Direction.NORTH:
@@ -73,32 +112,135 @@ class Agent:
     def _turn_right(self):
         self.direction = Direction((self.direction.value + 1) % 4)
 
-def plotar_grid(posicao, visitadas):
-    grid = np.zeros((N, N))
-    for (x, y) in visitadas:
-        grid[y, x] = 1  # células visitadas
-    grid[posicao[1], posicao[0]] = 2  # posição do robô
-    plt.imshow(grid, cmap="Blues", origin="upper")
-    plt.grid(True)
-    plt.xticks(np.arange(-.5, N, 1), [])
-    plt.yticks(np.arange(-.5, N, 1), [])
-    plt.pause(0.1)
-    plt.clf()
-
-def run_simulation():
-    grid = Grid(N)
-    agent = Agent(start_x=0, start_y=0)
+def celulas_do_segmento(segmento):
+    """Células (linha, coluna) de um segmento (x0, y0, x1, y1), incluindo as pontas."""
+    x0, y0, x1, y1 = segmento
+    passo_x = (x1 > x0) - (x1 < x0)
+    passo_y = (y1 > y0) - (y1 < y0)
+    for i in range(max(abs(x1 - x0), abs(y1 - y0)) + 1):
+        yield (y0 + i * passo_y, x0 + i * passo_x)
+
+def simular_lote(inicios_x, inicios_y, tamanhos, direcoes=None):
+    """
+    Roda o laço de run_simulation para K agentes ao mesmo tempo, cada um em seu
+    próprio grid vazio de lado tamanhos[k]. Posições, direções, paredes tocadas
+    (4 bits, um por Direction.value) e passos ficam em arrays NumPy, e cada passo
+    avança todos os agentes ativos de uma vez; quem descobre as quatro paredes sai
+    do lote. O resultado de cada agente é idêntico ao do laço individual.
+    Retorna um dicionário com os arrays 'passos', 'x', 'y' e 'direcao' finais.
+    """
+    x = np.array(inicios_x, dtype=np.int64)
+    y = np.array(inicios_y, dtype=np.int64)
+    tamanhos = np.broadcast_to(np.asarray(tamanhos, dtype=np.int64), x.shape).copy()
+    if direcoes is None:
+        direcao = np.full(x.shape, Direction.NORTH.value, dtype=np.int64)
+    else:
+        direcao = np.array([d.value if isinstance(d, Direction) else d for d in direcoes], dtype=np.int64)
+    paredes = np.zeros(x.shape, dtype=np.int64)
+    passos = np.zeros(x.shape, dtype=np.int64)
+
+    passo_x = np.array([dx for dx, _ in PASSOS])
+    passo_y = np.array([dy for _, dy in PASSOS])
+
+    ativos = np.arange(x.size)
+    while ativos.size:
+        ax, ay, ad, lado = x[ativos], y[ativos], direcao[ativos], tamanhos[ativos]
+        nx, ny = ax + passo_x[ad], ay + passo_y[ad]
+        parede = (nx < 0) | (nx >= lado) | (ny < 0) | (ny >= lado)
+
+        x[ativos] = np.where(parede, ax, nx)
+        y[ativos] = np.where(parede, ay, ny)
+        paredes[ativos] |= np.where(parede, 1 << ad, 0)
+        direcao[ativos] = np.where(parede, (ad + 1) % 4, ad)
+        passos[ativos] += 1
+
+        ativos = ativos[paredes[ativos] != 0b1111]
+
+    return {"passos": passos, "x": x, "y": y, "direcao": direcao}
+
+_janela = None
+
+def plotar_grid(posicao, visitadas, janela=None):
+    """
+    Envia um quadro para a janela: 'visitadas' (pares (x, y)) entram no rastro e o
+    robô vai para 'posicao' (x, y). Sem 'janela' (um BackgroundRenderer) usa uma
+    janela N x N do módulo, aberta na primeira chamada.
+    """
+    global _janela
+    if janela is None:
+        if _janela is None:
+            _janela = BackgroundRenderer(np.zeros((N, N), dtype=int), CORES, VISITADA, figsize=(5, 5))
+        janela = _janela
+    janela.push({"robo": ((posicao[1], posicao[0]), ROBO)}, trail=[(y, x) for x, y in visitadas])
+
+def run_simulation(headless=False, frames=None, fast_forward=False, size=N, terminal=False):
+    """
+    Roda a simulação até o agente tocar as quatro paredes.
+    Sem 'headless' o grid é desenhado numa janela em outro processo, que descarta
+    quadros se ficar para trás em vez de segurar a simulação; com 'terminal' ele é
+    desenhado no terminal. 'frames' salva cada passo em um arquivo .npz.
+    Com 'fast_forward' o agente pula direto de parede em parede e guarda só os
+    segmentos percorridos, então o custo não depende do tamanho do grid; a
+    contagem de movimentos é a mesma do laço célula a célula. Janela, terminal e
+    'frames' guardam o grid inteiro e só são aceitos até TAMANHO_MAXIMO_DESENHO.
+    """
+    if size > TAMANHO_MAXIMO_DESENHO and (frames or terminal or not headless):
+        raise ValueError(f"Grids maiores que {TAMANHO_MAXIMO_DESENHO} só rodam com --headless e sem --frames/--terminal")
+    grid = Grid(size)
+    agent = Agent(start_x=0, start_y=0, size=size)
     steps = 0
+    recorder = FrameRecorder(np.zeros((size, size), dtype=np.int8)) if frames else None
 
-    plt.figure(figsize=(5,5))
+    tela = janela = None
+    if terminal:
+        tela = TerminalRenderer(np.zeros((size, size)))
+        tela.update((agent.y, agent.x), [])
+    elif not headless:
+        janela = BackgroundRenderer(np.zeros((size, size), dtype=int), CORES, VISITADA, figsize=(5, 5))
+        janela.push({"robo": ((agent.y, agent.x), ROBO)})
 
     while not agent.has_discovered_all_walls():
+        if fast_forward:
+            steps += agent.avancar_ate_parede(grid)
+            celulas = list(celulas_do_segmento(agent.segmentos[-1])) if recorder or tela or janela else []
+            if recorder:
+                recorder.record((agent.y, agent.x), [(celula, 1) for celula in celulas])
+            if tela:
+                tela.mark(celulas)
+                tela.move_robot((agent.y, agent.x))
+                tela.draw()
+            elif janela:
+                janela.push({"robo": ((agent.y, agent.x), ROBO)}, trail=celulas)
+            continue
+
+        anterior = (agent.y, agent.x)
         agent.move(grid)
         steps += 1
-        plotar_grid((agent.x, agent.y), agent.visitadas)
-
-    plt.close()
+        if recorder:
+            recorder.record((agent.y, agent.x), [(anterior, 1)])
+        if tela:
+            tela.mark([anterior])
+            tela.move_robot((agent.y, agent.x))
+            tela.draw()
+        elif janela:
+            janela.push({"robo": ((agent.y, agent.x), ROBO)}, trail=[anterior])
+
+    if tela:
+        tela.close()
+    elif janela:
+        janela.close("Limites descobertos! Feche a janela para terminar.")
+    if recorder:
+        recorder.save(frames)
     print(f"✅ Robô descobriu todos os limites em {steps} movimentos!")
+    return {"steps": steps}
+
+def opcoes_extras(parser):
+    parser.add_argument("--fast-forward", action="store_true",
+                        help="pula de parede em parede em vez de andar célula a célula")
+    parser.add_argument("--size", type=int, default=N, help="lado do grid")
+    parser.add_argument("--terminal", action="store_true", help="desenha no terminal (ANSI) em vez do matplotlib")
 
 if __name__ == "__main__":
-    run_simulation()
+    args = parse_run_args("Agente que descobre os limites do grid", seeded=False, extra=opcoes_extras)
+    run_simulation(headless=args.headless, frames=args.frames, fast_forward=args.fast_forward, size=args.size,
+                   terminal=args.terminal)
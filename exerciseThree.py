@@ -1,11 +1,23 @@
+import heapq
+import os
 import random
-import matplotlib.pyplot as plt
+import sys
+import time
 import numpy as np
-from collections import deque
-from matplotlib.colors import ListedColormap
+from array import array
+from collections import OrderedDict, deque, namedtuple
+from functools import wraps
+from gridUtils import GridMap
+from renderUtils import BackgroundRenderer
+from robotUtils import FrameRecorder, parse_run_args
+from searchUtils import SearchStats, descend_field, wavefront_field
 
 GRID_SIZE = 10
+# Each of the caches below keeps at most this many bytes of results
+DISTANCE_FIELD_CACHE_BYTES = 256 << 20
 DIRECTIONS = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+# 0 free, 1 obstacle, 2 goal, 3 start, 4 visited, 5 robot
+PALETTE = ['#FFFFFF', '#6c757d', '#d00000', '#52b788', '#a2d2ff', '#0077b6']
 
 DEFINED_OBSTACLES = {
     (0, 5),
@@ -20,94 +32,425 @@ DEFINED_OBSTACLES = {
     (9, 5)
 }
 
-def find_path_bfs(start_node, goal_node, obstacles):
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'currsize', 'nbytes', 'maxbytes'])
+
+
+def _cache_by_bytes(nbytes):
     """
-    Finds the shortest path between 'start_node' and 'goal_node' using BFS.
-    Returns a list of tuples representing the path, or None if no path exists.
+    lru_cache bounded by memory instead of entry count: results are weighed with
+    nbytes(result) and the least recently used are evicted once the cache holds more
+    than DISTANCE_FIELD_CACHE_BYTES (the newest result is always kept).
     """
+    def decorate(function):
+        entries = OrderedDict()
+        info = {'hits': 0, 'misses': 0, 'nbytes': 0}
+
+        @wraps(function)
+        def cached(*key):
+            if key in entries:
+                entries.move_to_end(key)
+                info['hits'] += 1
+                return entries[key][0]
+            info['misses'] += 1
+            result = function(*key)
+            entries[key] = (result, nbytes(result))
+            info['nbytes'] += entries[key][1]
+            while info['nbytes'] > DISTANCE_FIELD_CACHE_BYTES and len(entries) > 1:
+                info['nbytes'] -= entries.popitem(last=False)[1][1]
+            return result
+
+        def cache_clear():
+            entries.clear()
+            info.update(hits=0, misses=0, nbytes=0)
+
+        cached.cache_info = lambda: CacheInfo(info['hits'], info['misses'], len(entries), info['nbytes'],
+                                              DISTANCE_FIELD_CACHE_BYTES)
+        cached.cache_clear = cache_clear
+        return cached
+    return decorate
+
+
+def find_path_bfs(start_node, goal_node, obstacles, backend="bfs", stats=None, grid_size=None):
+    """
+    Shortest path from 'start_node' to 'goal_node' (list of cells, None if unreachable) around 'obstacles',
+    a set of cells on a 'grid_size' square (GRID_SIZE by default) or a GridMap searched in place.
+    backend: "bfs" or "wavefront" (cached distance field), "jps" or "bidirectional"; 'stats' is a SearchStats.
+    """
+    grid_size = grid_size or GRID_SIZE
+    if stats is None:
+        return _find_path(start_node, goal_node, obstacles, backend, grid_size)[0]
+    started = time.perf_counter()
+    cache = _wavefront_field if backend == "wavefront" else _distance_field
+    hits = cache.cache_info().hits
+    path, counters = _find_path(start_node, goal_node, obstacles, backend, grid_size)
+    cache_hits = cache.cache_info().hits - hits
+    stats.record(time.perf_counter() - started, *(() if cache_hits else counters), cache_hits=cache_hits)
+    return path
+
+
+def _find_path(start_node, goal_node, obstacles, backend, grid_size):
+    """find_path_bfs's search; returns (path, counters) with the counters in SearchStats.record order."""
+    if backend == "jps":
+        path, expanded = find_path_jps(start_node, goal_node, obstacles, grid_size)
+        return path, (expanded,)
+    if backend == "bidirectional":
+        path, expanded = find_path_bidirectional_bfs(start_node, goal_node, obstacles, grid_size)
+        return path, (expanded,)
+    if backend not in ("bfs", "wavefront"):
+        raise ValueError(f"Unknown backend: {backend}")
+
     if start_node == goal_node:
-        return [start_node]
+        return [start_node], ()
+    obstacles = _grid_key(obstacles)
+    grid = _grid(obstacles, grid_size)
+    if goal_node in grid.blocked:
+        return None, ()
+
+    field = _wavefront_field if backend == "wavefront" else _distance_field
+    distances, counters = field(obstacles, goal_node, grid_size)
+
+    def distance(node):
+        if grid.in_bounds(node):
+            return distances[grid.index(node)]
+        return -1
+
+    if distance(start_node) >= 0:
+        return descend_field(grid, distances, start_node), counters
+    # The start may sit on an obstacle; it can still step onto its closest free neighbour
+    reachable = [neighbor for neighbor in ((start_node[0] + dx, start_node[1] + dy) for dx, dy in DIRECTIONS)
+                 if distance(neighbor) >= 0]
+    if not reachable:
+        return None, counters
+    return [start_node] + descend_field(grid, distances, min(reachable, key=distance)), counters
+
+
+def _grid_key(obstacles):
+    """Cache key of 'obstacles': a GridMap stands for itself, cells are frozen into a set."""
+    return obstacles if isinstance(obstacles, GridMap) else frozenset(obstacles)
+
+
+def _grid(obstacles, grid_size):
+    """The GridMap to search: 'obstacles' itself, or a grid_size square with those cells blocked."""
+    if isinstance(obstacles, GridMap):
+        return obstacles
+    return _grid_map(frozenset(obstacles), grid_size)
+
+
+@_cache_by_bytes(lambda grid: len(grid.blocked.bits))
+def _grid_map(obstacles, grid_size):
+    return GridMap(grid_size, grid_size, obstacles)
+
 
-    queue = deque([start_node])
-    predecessors = {start_node: None}
+@_cache_by_bytes(lambda field: memoryview(field[0]).nbytes)
+def _distance_field(obstacles, goal_node, grid_size):
+    """
+    BFS distances (flat int32 array, -1 where unreachable) from every free cell to 'goal_node',
+    cached with the BFS's own counters (expansions, pushes, pops, stale pops, peak queue).
+    """
+    grid = _grid(obstacles, grid_size)
+    distances = array('i', [-1]) * grid.size
+    goal_index = grid.index(goal_node)
+    distances[goal_index] = 0
+    queue = deque([goal_index])
+    expanded = peak = 0
 
     while queue:
-        current_node = queue.popleft()
+        current_index = queue.popleft()
+        expanded += 1
+        next_distance = distances[current_index] + 1
+        for neighbor in grid.free_neighbors(current_index):
+            if distances[neighbor] < 0:
+                distances[neighbor] = next_distance
+                queue.append(neighbor)
+        if len(queue) > peak:
+            peak = len(queue)
+
+    return distances, (expanded, expanded, expanded, 0, max(peak, 1))
+
+
+@_cache_by_bytes(lambda field: field[0].nbytes)
+def _wavefront_field(obstacles, goal_node, grid_size):
+    """_distance_field computed by wavefront_field; every reachable cell counts as one expansion."""
+    distances = wavefront_field(_grid(obstacles, grid_size), goal_node)
+    reached = distances[distances >= 0]
+    return distances, (reached.size, reached.size, reached.size, 0, int(np.bincount(reached).max()))
+
+
+def find_path_plain_bfs(start_node, goal_node, obstacles, grid_size=None):
+    """
+    Uncached BFS from 'start_node', the reference the other backends are measured against.
+    Returns (path, expanded nodes).
+    """
+    if start_node == goal_node:
+        return [start_node], 0
 
-        if current_node == goal_node:
+    grid = _grid(obstacles, grid_size or GRID_SIZE)
+    start_index, goal_index = grid.index(start_node), grid.index(goal_node)
+    predecessors = {start_index: None}
+    queue = deque([start_index])
+    expanded = 0
+
+    while queue:
+        current_index = queue.popleft()
+        if current_index == goal_index:
             path = []
-            while current_node is not None:
-                path.append(current_node)
-                current_node = predecessors[current_node]
+            while current_index is not None:
+                path.append(grid.cell(current_index))
+                current_index = predecessors[current_index]
             path.reverse()
-            return path
+            return path, expanded
+        expanded += 1
+        for neighbor in grid.free_neighbors(current_index):
+            if neighbor not in predecessors:
+                predecessors[neighbor] = current_index
+                queue.append(neighbor)
 
-        for dx, dy in DIRECTIONS:
-            neighbor_x, neighbor_y = current_node[0] + dx, current_node[1] + dy
-            neighbor = (neighbor_x, neighbor_y)
+    return None, expanded
 
-            if (0 <= neighbor_x < GRID_SIZE and 0 <= neighbor_y < GRID_SIZE and
-                    neighbor not in obstacles and
-                    neighbor not in predecessors):
-                predecessors[neighbor] = current_node
-                queue.append(neighbor)
-    
-    return None
+
+def find_path_bidirectional_bfs(start_node, goal_node, obstacles, grid_size=None):
+    """
+    BFS from both ends, one whole layer at a time on the side with the smaller frontier,
+    stopping when a newly reached cell was already reached by the other side. Each search
+    covers about half the distance, so a distant pair costs two small balls instead of
+    one large one. Returns (path, expanded nodes).
+    """
+    if start_node == goal_node:
+        return [start_node], 0
+    grid = _grid(obstacles, grid_size or GRID_SIZE)
+    if goal_node in grid.blocked:
+        return None, 0
+
+    start_index, goal_index = grid.index(start_node), grid.index(goal_node)
+    predecessors = ({start_index: None}, {goal_index: None})
+    frontiers = ([start_index], [goal_index])
+    expanded = 0
+    meeting = None
+
+    while meeting is None and frontiers[0] and frontiers[1]:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        reached, other = predecessors[side], predecessors[1 - side]
+        next_frontier = []
+        for current_index in frontiers[side]:
+            expanded += 1
+            for neighbor in grid.free_neighbors(current_index):
+                if neighbor not in reached:
+                    reached[neighbor] = current_index
+                    next_frontier.append(neighbor)
+                    if neighbor in other:
+                        meeting = neighbor
+                        break
+            if meeting is not None:
+                break
+        frontiers[side][:] = next_frontier
+
+    if meeting is None:
+        return None, expanded
+    path = []
+    current_index = meeting
+    while current_index is not None:
+        path.append(grid.cell(current_index))
+        current_index = predecessors[0][current_index]
+    path.reverse()
+    current_index = predecessors[1][meeting]
+    while current_index is not None:
+        path.append(grid.cell(current_index))
+        current_index = predecessors[1][current_index]
+    return path, expanded
+
+
+def find_path_jps(start_node, goal_node, obstacles, grid_size=None):
+    """
+    Jump Point Search for the unit-cost 4-connected grid.
+    Of all equal-length paths only the canonical ones (vertical moves before
+    horizontal ones) are followed: straight runs are jumped over and only the
+    cells where the canonical path may turn (jump points) enter the open list.
+    Returns (path, expanded jump points); the path is as long as the BFS one.
+    """
+    if start_node == goal_node:
+        return [start_node], 0
+    obstacles = _grid_key(obstacles)
+    grid = _grid(obstacles, grid_size or GRID_SIZE)
+    if goal_node in grid.blocked:
+        return None, 0
+
+    size = grid.rows
+    blocked_rows, forced_right, forced_left = _jump_tables(obstacles, size)
+    goal_r, goal_c = goal_node
+    goal_bit = 1 << goal_c
+
+    def free(r, c):
+        return 0 <= r < size and 0 <= c < size and not blocked_rows[r] >> c & 1
+
+    # Horizontal jumps are bit scans over the row masks: the first forced cell (or
+    # the goal) in the scan direction, provided no obstacle comes before it
+    def jump_right(r, c):
+        events = (forced_right[r] | (goal_bit if r == goal_r else 0)) >> (c + 1)
+        if not events:
+            return None
+        blockers = blocked_rows[r] >> (c + 1)
+        first_event = (events & -events).bit_length()
+        if first_event < (blockers & -blockers).bit_length():
+            return (r, c + first_event)
+        return None
+
+    def jump_left(r, c):
+        below = (1 << c) - 1
+        events = (forced_left[r] | (goal_bit if r == goal_r else 0)) & below
+        if events.bit_length() > (blocked_rows[r] & below).bit_length():
+            return (r, events.bit_length() - 1)
+        return None
+
+    def jump_horizontal(r, c, dc):
+        return jump_right(r, c) if dc > 0 else jump_left(r, c)
+
+    def jump_vertical(r, c, dr):
+        while True:
+            r += dr
+            if not free(r, c):
+                return None
+            if (r == goal_r and c == goal_c) or jump_right(r, c) or jump_left(r, c):
+                return (r, c)
+
+    def successors(r, c, direction):
+        if direction is None:
+            moves = range(4)
+        else:
+            dr, dc = DIRECTIONS[direction]
+            if dr:
+                moves = (direction, 0, 2)
+            else:
+                moves = [direction] + [move for move in (1, 3)
+                                       if free(r + DIRECTIONS[move][0], c) and
+                                       not free(r + DIRECTIONS[move][0], c - dc)]
+        for move in moves:
+            dr, dc = DIRECTIONS[move]
+            point = jump_vertical(r, c, dr) if dr else jump_horizontal(r, c, dc)
+            if point:
+                yield point, move
+
+    start_state = (start_node, None)
+    g_score = {start_state: 0}
+    came_from = {start_state: None}
+    open_set = [(abs(start_node[0] - goal_r) + abs(start_node[1] - goal_c), 0, start_node, -1)]
+    closed = set()
+    expanded = 0
+
+    while open_set:
+        _, g, node, direction = heapq.heappop(open_set)
+        state = (node, None if direction < 0 else direction)
+        if state in closed:
+            continue
+        if node == goal_node:
+            return _interpolate_jump_points(came_from, state), expanded
+        closed.add(state)
+        expanded += 1
+        for point, move in successors(node[0], node[1], state[1]):
+            next_state = (point, move)
+            next_g = g + abs(point[0] - node[0]) + abs(point[1] - node[1])
+            if next_g < g_score.get(next_state, float('inf')):
+                g_score[next_state] = next_g
+                came_from[next_state] = state
+                heapq.heappush(open_set, (next_g + abs(point[0] - goal_r) + abs(point[1] - goal_c), next_g, point, move))
+
+    return None, expanded
+
+
+@_cache_by_bytes(lambda tables: sum(sys.getsizeof(row) for table in tables for row in table))
+def _jump_tables(obstacles, grid_size):
+    """
+    Per-row bitmasks for find_path_jps: obstacles (plus a sentinel bit past the last
+    column) and the cells where a rightward/leftward run has a forced vertical turn,
+    i.e. the cell above or below is free but the one diagonally behind it is not.
+    """
+    full = (1 << grid_size) - 1
+    rows = [0] * grid_size
+    for r, c in obstacles.blocked if isinstance(obstacles, GridMap) else obstacles:
+        if 0 <= r < grid_size and 0 <= c < grid_size:
+            rows[r] |= 1 << c
+    # Rows outside the grid count as fully blocked, so they never force a turn
+    outside = full
+    forced_right, forced_left = [], []
+    for r in range(grid_size):
+        right = left = 0
+        for side in (rows[r - 1] if r > 0 else outside, rows[r + 1] if r + 1 < grid_size else outside):
+            right |= ~side & (side << 1) & full
+            left |= ~side & (side >> 1) & full
+        forced_right.append(right)
+        forced_left.append(left)
+    blocked_rows = [row | (1 << grid_size) for row in rows]
+    return blocked_rows, forced_right, forced_left
+
+
+def _interpolate_jump_points(came_from, state):
+    """
+    Expands the chain of jump points ending at 'state' into the full cell-by-cell path.
+    """
+    points = []
+    while state is not None:
+        points.append(state[0])
+        state = came_from[state]
+    points.reverse()
+
+    path = [points[0]]
+    for (r0, c0), (r1, c1) in zip(points, points[1:]):
+        dr, dc = (r1 > r0) - (r1 < r0), (c1 > c0) - (c1 < c0)
+        for step in range(1, abs(r1 - r0) + abs(c1 - c0) + 1):
+            path.append((r0 + step * dr, c0 + step * dc))
+    return path
+
+
+def distance_field_cache_info():
+    """
+    Hits, misses, entries and bytes of the distance-field cache used by find_path_bfs.
+    """
+    return _distance_field.cache_info()
 
 def animate_path(path, start_node, goal_node, obstacles):
     """
     Animates the robot's movement, showing the traversed path, and waits for user input to close.
+    Obstacles are drawn once; each frame only repaints the cells the robot left and entered.
+    The window runs in its own process with room for every step of the path.
     """
-    plt.figure(figsize=(7, 7))
-    
-    cmap = ListedColormap(['#FFFFFF', '#6c757d', '#d00000', '#52b788', '#a2d2ff', '#0077b6'])
+    terrain = np.zeros((GRID_SIZE, GRID_SIZE), dtype=int)
+    for obs in obstacles:
+        terrain[obs] = 1
 
-    visited_path = set()
+    renderer = BackgroundRenderer(terrain, PALETTE, 4, "Goal-Based Agent in Action", pause=0.4, maxsize=len(path) + 2)
+    renderer.push({"start": (start_node, 3), "goal": (goal_node, 2)})
 
     for position in path:
-        visited_path.add(position)
-        grid = np.zeros((GRID_SIZE, GRID_SIZE))
-
-        for obs in obstacles:
-            grid[obs] = 1
-        
-        for visited_pos in visited_path:
-            grid[visited_pos] = 4
-        
-        grid[start_node] = 3
-        grid[goal_node] = 2
-        grid[position] = 5
-
-        plt.imshow(grid, cmap=cmap)
-        plt.title("Goal-Based Agent in Action")
-        plt.grid(True, which='both', color='k', linewidth=0.5)
-        plt.xticks(np.arange(-.5, GRID_SIZE, 1), [])
-        plt.yticks(np.arange(-.5, GRID_SIZE, 1), [])
-        plt.pause(0.4) 
-        plt.clf()
-
-    final_grid = np.zeros((GRID_SIZE, GRID_SIZE))
+        renderer.push({"robot": (position, 5)}, trail=[position])
+
+    renderer.push({"robot": None})
+    renderer.close("Path Complete! Close the window to continue.")
+
+
+def record_path(path, start_node, goal_node, obstacles, frames):
+    """
+    Saves the robot's movement along 'path' to 'frames' for later playback.
+    """
+    base_grid = np.zeros((GRID_SIZE, GRID_SIZE), dtype=np.int8)
     for obs in obstacles:
-        final_grid[obs] = 1
-    
-    for pos in path:
-        final_grid[pos] = 4
-    
-    final_grid[start_node] = 3
-    final_grid[goal_node] = 2
-    
-    plt.imshow(final_grid, cmap=cmap)
-    plt.title("Path Complete! Close the window to continue.")
-    plt.grid(True, which='both', color='k', linewidth=0.5)
-    plt.xticks(np.arange(-.5, GRID_SIZE, 1), [])
-    plt.yticks(np.arange(-.5, GRID_SIZE, 1), [])
-    
-    plt.show()
-
-
-def run_stage(with_obstacles):
+        base_grid[obs] = 1
+    base_grid[start_node] = 3
+    base_grid[goal_node] = 2
+
+    recorder = FrameRecorder(base_grid)
+    for position in path:
+        changed = [] if position in (start_node, goal_node) else [(position, 4)]
+        recorder.record(position, changed)
+    recorder.save(frames)
+
+
+def run_stage(with_obstacles, headless=False, seed=None, frames=None, backend="bfs", stats=None, compare=False):
     """
     Executes a phase, finds the path, and runs the animation.
+    'seed' makes the start/goal draw reproducible, 'headless' skips the animation,
+    'frames' saves every step to a .npz file, 'backend' picks the planner
+    ("bfs", "wavefront", "jps" or "bidirectional") and 'stats' (a SearchStats) collects the
+    search counters. 'compare' also runs find_path_plain_bfs and prints its expansions
+    next to the jps/bidirectional ones. Returns the evaluation metrics.
     """
     if with_obstacles:
         print("--- Stage 2: Environment with Obstacles ---")
@@ -116,15 +459,25 @@ def run_stage(with_obstacles):
         print("--- Stage 1: Free Environment ---")
         obstacles = set()
 
+    rng = random.Random(seed)
     while True:
-        start_node = (random.randint(0, GRID_SIZE - 1), random.randint(0, GRID_SIZE - 1))
-        goal_node = (random.randint(0, GRID_SIZE - 1), random.randint(0, GRID_SIZE - 1))
+        start_node = (rng.randint(0, GRID_SIZE - 1), rng.randint(0, GRID_SIZE - 1))
+        goal_node = (rng.randint(0, GRID_SIZE - 1), rng.randint(0, GRID_SIZE - 1))
         if start_node != goal_node and start_node not in obstacles and goal_node not in obstacles:
             break
             
     print(f"Objective: Go from {start_node} to {goal_node}")
 
-    found_path = find_path_bfs(start_node, goal_node, obstacles)
+    query_stats = stats if stats is not None else SearchStats()
+    expanded = query_stats.expansions
+    found_path = find_path_bfs(start_node, goal_node, obstacles, backend, query_stats)
+    if backend in ("jps", "bidirectional"):
+        expanded = query_stats.expansions - expanded
+        if compare:
+            _, plain_expanded = find_path_plain_bfs(start_node, goal_node, obstacles)
+            print(f"Expanded nodes: {expanded} (plain BFS: {plain_expanded})")
+        else:
+            print(f"Expanded nodes: {expanded}")
 
     if found_path:
         success = "Yes"
@@ -133,9 +486,12 @@ def run_stage(with_obstacles):
         print("\nEvaluation Metrics:")
         print(f"  - Task Success: {success}")
         print(f"  - Path Length: {path_length} steps")
-        print("\nStarting animation...")
-        animate_path(found_path, start_node, goal_node, obstacles)
-        print("Animation finished.")
+        if frames:
+            record_path(found_path, start_node, goal_node, obstacles, frames)
+        if not headless:
+            print("\nStarting animation...")
+            animate_path(found_path, start_node, goal_node, obstacles)
+            print("Animation finished.")
     else:
         success = "No"
         path_length = "N/A"
@@ -144,8 +500,32 @@ def run_stage(with_obstacles):
         print(f"  - Task Success: {success}")
         print(f"  - Path Length: {path_length} steps")
 
+    return {"success": found_path is not None, "path_length": len(found_path) - 1 if found_path else None}
+
+
+def stage_frames(frames, stage):
+    """Derives a per-stage file name from the --frames option (None stays None)."""
+    if not frames:
+        return None
+    root, ext = os.path.splitext(frames)
+    return f"{root}_stage{stage}{ext or '.npz'}"
+
+
+def stage_options(parser):
+    parser.add_argument("--backend", choices=["bfs", "wavefront", "jps", "bidirectional"], default="bfs",
+                        help="path planner used by both stages")
+    parser.add_argument("--stats", default=None, help="write both stages' search counters to this JSON file")
+    parser.add_argument("--compare", action="store_true",
+                        help="also run a plain BFS and print its expansions (jps and bidirectional backends)")
+
 
 if __name__ == "__main__":
-    run_stage(with_obstacles=False)
+    args = parse_run_args("Goal-based agent (BFS) in a free and an obstacle environment", extra=stage_options)
+    stats = SearchStats() if args.stats else None
+    run_stage(with_obstacles=False, headless=args.headless, seed=args.seed,
+              frames=stage_frames(args.frames, 1), backend=args.backend, stats=stats, compare=args.compare)
     print("\n" + "="*40 + "\n")
-    run_stage(with_obstacles=True)
\ No newline at end of file
+    run_stage(with_obstacles=True, headless=args.headless, seed=args.seed,
+              frames=stage_frames(args.frames, 2), backend=args.backend, stats=stats, compare=args.compare)
+    if stats:
+        stats.to_json(args.stats)
@@ -1,8 +1,12 @@
 import random
-import matplotlib.pyplot as plt
 import numpy as np
 import time
+from array import array
 from collections import deque
+from gridUtils import CellMask, GridMap
+from renderUtils import BackgroundRenderer
+from searchUtils import wavefront_field
+from robotUtils import BLOCKED, FREE, FrameRecorder, TerminalRenderer, parse_run_args
 
 N = 10
 direcoes = [(0, 1), (1, 0), (0, -1), (-1, 0)]  
@@ -20,88 +24,455 @@ obstaculos = {
     (9, 5)
 }
 
-def plotar_grid(posicao, visitadas):
-    """Exibe o grid com obstáculos, células visitadas e posição do robô"""
-    grid = np.zeros((N, N))
+# Mapa compacto (obstáculos em bits, índices planos) usado pelas buscas
+MAPA = GridMap(N, N, obstaculos)
 
-    for (x, y) in obstaculos:
-        grid[x, y] = -1 
+# Cores da janela: célula livre, obstáculo, visitada e robô
+CORES = ['#f7fbff', '#525252', '#6baed6', '#08306b']
+OBSTACULO, VISITADA, ROBO = 1, 2, 3
 
-    for (x, y) in visitadas:
-        grid[x, y] = 1  
+_janela = None
 
-    grid[posicao] = 2 
+def plotar_grid(posicao, visitadas, janela=None):
+    """
+    Envia um quadro para a janela: 'visitadas' entram no rastro e o robô vai para
+    'posicao'. Sem 'janela' (um BackgroundRenderer) usa uma janela do módulo com os
+    obstáculos de MAPA, aberta na primeira chamada.
+    """
+    global _janela
+    if janela is None:
+        if _janela is None:
+            _janela = BackgroundRenderer(np.where(MAPA.blocked.to_array(), OBSTACULO, 0), CORES, VISITADA,
+                                         figsize=(6, 6))
+        janela = _janela
+    janela.push({"robo": (posicao, ROBO)}, trail=visitadas)
 
-    plt.imshow(grid, cmap="Blues")
-    plt.grid(True)
-    plt.xticks(np.arange(-.5, N, 1), [])
-    plt.yticks(np.arange(-.5, N, 1), [])
-    plt.pause(0.1)
-    plt.clf()
-
-def bfs(celula_inicial, visitadas):
-    """Encontra a célula não visitada mais próxima usando BFS"""
-    fila = deque([celula_inicial])
-    predecessores = {celula_inicial: None}
+def bfs(celula_inicial, visitadas, stats=None, mapa=MAPA):
+    """
+    Encontra a célula não visitada mais próxima usando BFS.
+    'stats' é um SearchStats opcional que recebe os contadores da busca e 'mapa'
+    é o GridMap onde ela roda.
+    """
+    inicio_tempo = time.perf_counter() if stats is not None else 0
+    if not isinstance(visitadas, CellMask):
+        visitadas = CellMask.from_cells(mapa.rows, mapa.cols, visitadas)
+    inicio = mapa.index(celula_inicial)
+    fila = deque([inicio])
+    predecessores = {inicio: None}
+    expandidas = pico = 0
+    caminho = None
 
     while fila:
-        x, y = fila.popleft()
+        atual = fila.popleft()
 
-        if (x, y) not in visitadas:
+        if not visitadas.test(atual):
             caminho = []
-            atual = (x, y)
             while atual is not None:
-                caminho.append(atual)
+                caminho.append(mapa.cell(atual))
                 atual = predecessores[atual]
             caminho.reverse()
-            return caminho
+            break
+
+        expandidas += 1
+        for vizinha in mapa.free_neighbors(atual):
+            if vizinha not in predecessores:
+                predecessores[vizinha] = atual
+                fila.append(vizinha)
+        if len(fila) > pico:
+            pico = len(fila)
+
+    if stats is not None:
+        # Cada célula entra na fila uma única vez, então não há remoções obsoletas
+        stats.record(time.perf_counter() - inicio_tempo, expandidas, len(predecessores),
+                     len(predecessores) - len(fila), 0, max(pico, 1))
+    return caminho
+
+class Fronteira:
+    """
+    Motor de exploração incremental: guarda em buffers planos quais células já foram
+    visitadas e quantas ainda faltam em cada região conexa do mapa, atualizados a cada
+    célula visitada. Assim a célula não visitada mais próxima é achada sem montar um
+    dicionário novo por busca, sem busca nenhuma quando há uma vizinha livre e sem
+    inundar a região inteira quando não sobrou nada alcançável.
+    """
+
+    def __init__(self, visitadas, mapa=MAPA):
+        self.mapa = mapa
+        self.visitada = CellMask.from_cells(mapa.rows, mapa.cols, visitadas)
+
+        # Região conexa de cada célula e quantas não visitadas restam em cada uma
+        self.regiao = array('l', [-1]) * mapa.size
+        self.restantes = []
+        for i in range(mapa.size):
+            if not mapa.blocked.test(i) and self.regiao[i] < 0:
+                regiao = len(self.restantes)
+                self.regiao[i] = regiao
+                pilha = [i]
+                restantes = 0
+                while pilha:
+                    atual = pilha.pop()
+                    restantes += not self.visitada.test(atual)
+                    for vizinha in mapa.free_neighbors(atual):
+                        if self.regiao[vizinha] < 0:
+                            self.regiao[vizinha] = regiao
+                            pilha.append(vizinha)
+                self.restantes.append(restantes)
+
+        self.marca = array('l', [0]) * mapa.size
+        self.predecessor = array('l', [-1]) * mapa.size
+        self.busca = 0
 
-        for dx, dy in direcoes:
-            nx, ny = x + dx, y + dy
-            if (0 <= nx < N and 0 <= ny < N and
-                (nx, ny) not in obstaculos and
-                (nx, ny) not in predecessores):
-                predecessores[(nx, ny)] = (x, y)
-                fila.append((nx, ny))
+    def visitar(self, celula):
+        i = self.mapa.index(celula)
+        if not self.visitada.test(i):
+            self.visitada.set(i)
+            self.restantes[self.regiao[i]] -= 1
 
-    return None  
+    def caminho(self, origem):
+        """
+        Caminho até a célula não visitada mais próxima (o mesmo que bfs devolve),
+        ou None se não sobrou nenhuma alcançável.
+        """
+        mapa = self.mapa
+        inicio = mapa.index(origem)
+        if not self.restantes[self.regiao[inicio]]:
+            return None
+        visitada = self.visitada.bits
+        for vizinha in mapa.free_neighbors(inicio):
+            if not visitada[vizinha >> 3] >> (vizinha & 7) & 1:
+                return [origem, mapa.cell(vizinha)]
 
-def mover_robo():
+        # Cada busca usa um número novo em 'marca', então os buffers nunca são limpos
+        self.busca += 1
+        busca, marca, predecessor = self.busca, self.marca, self.predecessor
+        marca[inicio] = busca
+        fila = deque([inicio])
+        while fila:
+            atual = fila.popleft()
+            if not visitada[atual >> 3] >> (atual & 7) & 1:
+                caminho = []
+                while atual != inicio:
+                    caminho.append(mapa.cell(atual))
+                    atual = predecessor[atual]
+                caminho.append(origem)
+                caminho.reverse()
+                return caminho
+            for vizinha in mapa.free_neighbors(atual):
+                if marca[vizinha] != busca:
+                    marca[vizinha] = busca
+                    predecessor[vizinha] = atual
+                    fila.append(vizinha)
+        return None
+
+def explorar_guloso(origem, mapa=MAPA):
+    """Rota completa da política gulosa: sempre para a célula não visitada mais próxima."""
+    visitadas = mapa.mask()
+    visitadas.add(origem)
+    fronteira = Fronteira(visitadas, mapa)
+    rota = [origem]
     while True:
-        robo = (random.randint(0, N - 1), random.randint(0, N - 1))
-        if robo not in obstaculos:
+        caminho = fronteira.caminho(rota[-1])
+        if caminho is None:
+            return rota
+        for proxima in caminho[1:]:
+            fronteira.visitar(proxima)
+        rota.extend(caminho[1:])
+
+# Janela (em posições da ordem de visita) e máximo de passadas do 2-opt do planejador de cobertura
+JANELA_2OPT = 20
+PASSADAS_2OPT = 3
+
+def regiao_alcancavel(origem, mapa=MAPA):
+    """Máscara (linhas, colunas) booleana das células livres alcançáveis a partir de 'origem'."""
+    return (wavefront_field(mapa, origem) >= 0).reshape(mapa.rows, mapa.cols)
+
+def decompor_boustrofedon(alcancavel, por_linhas=False):
+    """
+    Decomposição boustrofédica da máscara 'alcancavel': varre as colunas (ou as linhas,
+    com 'por_linhas'), corta cada uma em trechos livres e só abre células novas nos
+    eventos de conectividade, quando um trecho surge, some, se divide ou se junta a
+    outro. Cada célula é a lista de trechos (faixa, início, fim) de faixas seguidas,
+    com extensão livre para variar de uma faixa para a outra.
+    """
+    mascara = alcancavel if por_linhas else alcancavel.T
+    livre = np.zeros((mascara.shape[0], mascara.shape[1] + 2), dtype=np.int8)
+    livre[:, 1:-1] = mascara
+    bordas = np.diff(livre, axis=1)
+    inicios = np.argwhere(bordas == 1)
+    fins = np.argwhere(bordas == -1)[:, 1] - 1
+    trechos = [[] for _ in range(mascara.shape[0])]
+    for (faixa, inicio), fim in zip(inicios.tolist(), fins.tolist()):
+        trechos[faixa].append((inicio, fim))
+
+    celulas = []
+    anteriores = []
+    for faixa, atuais in enumerate(trechos):
+        # Trechos que se tocam em faixas vizinhas; os dois lados estão ordenados
+        toques_anteriores = [0] * len(anteriores)
+        toques_atuais = [0] * len(atuais)
+        ligado = [None] * len(atuais)
+        i = j = 0
+        while i < len(anteriores) and j < len(atuais):
+            if anteriores[i][0] <= atuais[j][1] and atuais[j][0] <= anteriores[i][1]:
+                toques_anteriores[i] += 1
+                toques_atuais[j] += 1
+                ligado[j] = i
+            if anteriores[i][1] < atuais[j][1]:
+                i += 1
+            else:
+                j += 1
+        proximos = []
+        for j, (inicio, fim) in enumerate(atuais):
+            i = ligado[j]
+            if toques_atuais[j] == 1 and toques_anteriores[i] == 1:
+                celula = anteriores[i][2]
+            else:
+                celula = len(celulas)
+                celulas.append([])
+            celulas[celula].append((faixa, inicio, fim))
+            proximos.append((inicio, fim, celula))
+        anteriores = proximos
+    return celulas
+
+def varreduras(celula, por_linhas=False):
+    """
+    As quatro varreduras em zigue-zague de uma célula de decompor_boustrofedon (da
+    primeira ou da última faixa, começando pelo início ou pelo fim do trecho), cada
+    uma como a lista de segmentos retos (ponto inicial, ponto final), um por faixa.
+    O sentido alterna a cada faixa e cada segmento acompanha a extensão da célula.
+    """
+    def ponto(faixa, posicao):
+        return (faixa, posicao) if por_linhas else (posicao, faixa)
+
+    opcoes = []
+    for ordem in (celula, celula[::-1]):
+        for comeca_no_fim in (False, True):
+            segmentos = []
+            for i, (faixa, inicio, fim) in enumerate(ordem):
+                if (i % 2 == 1) != comeca_no_fim:
+                    inicio, fim = fim, inicio
+                segmentos.append((ponto(faixa, inicio), ponto(faixa, fim)))
+            opcoes.append(segmentos)
+    return opcoes
+
+def ordenar_celulas(celulas, origem, mapa=MAPA, por_linhas=False):
+    """
+    Ordem de visita das células (caixeiro-viajante aberto a partir de 'origem'):
+    vizinho mais próximo pela distância real, com uma BFS que para na primeira entrada
+    de alguma célula ainda não visitada (o começo de uma de suas varreduras), seguido
+    de até PASSADAS_2OPT passadas de 2-opt numa janela de JANELA_2OPT posições, com
+    distância Manhattan entre saída e próxima entrada.
+    Retorna listas [entrada, saída, segmentos, invertida].
+    """
+    entradas = {}
+    for celula, trechos in enumerate(celulas):
+        for segmentos in varreduras(trechos, por_linhas):
+            entradas.setdefault(mapa.index(segmentos[0][0]), []).append((celula, segmentos))
+
+    usada = bytearray(len(celulas))
+    marca = array('l', [0]) * mapa.size
+    rota = []
+    posicao = mapa.index(origem)
+    for busca in range(1, len(celulas) + 1):
+        marca[posicao] = busca
+        fila = deque([posicao])
+        escolhida = None
+        while escolhida is None:
+            atual = fila.popleft()
+            candidatas = entradas.get(atual)
+            if candidatas:
+                candidatas[:] = [item for item in candidatas if not usada[item[0]]]
+                if candidatas:
+                    escolhida = candidatas[0]
+                    break
+            for vizinha in mapa.free_neighbors(atual):
+                if marca[vizinha] != busca:
+                    marca[vizinha] = busca
+                    fila.append(vizinha)
+        celula, segmentos = escolhida
+        usada[celula] = 1
+        rota.append([segmentos[0][0], segmentos[-1][1], segmentos, False])
+        posicao = mapa.index(segmentos[-1][1])
+
+    for _ in range(PASSADAS_2OPT):
+        melhorou = False
+        for i in range(len(rota)):
+            linha_anterior, coluna_anterior = rota[i - 1][1] if i else origem
+            linha_entrada, coluna_entrada = rota[i][0]
+            ligacao = abs(linha_anterior - linha_entrada) + abs(coluna_anterior - coluna_entrada)
+            for j in range(i, min(len(rota), i + JANELA_2OPT)):
+                linha_saida, coluna_saida = rota[j][1]
+                antes = ligacao
+                depois = abs(linha_anterior - linha_saida) + abs(coluna_anterior - coluna_saida)
+                if j + 1 < len(rota):
+                    linha_seguinte, coluna_seguinte = rota[j + 1][0]
+                    antes += abs(linha_saida - linha_seguinte) + abs(coluna_saida - coluna_seguinte)
+                    depois += abs(linha_entrada - linha_seguinte) + abs(coluna_entrada - coluna_seguinte)
+                if depois < antes:
+                    # Inverter o trecho i..j também inverte o sentido de cada varredura nele
+                    rota[i:j + 1] = [[saida, entrada, segmentos, not invertida]
+                                     for entrada, saida, segmentos, invertida in reversed(rota[i:j + 1])]
+                    linha_entrada, coluna_entrada = rota[i][0]
+                    ligacao = abs(linha_anterior - linha_entrada) + abs(coluna_anterior - coluna_entrada)
+                    melhorou = True
+        if not melhorou:
             break
+    return rota
 
-    visitadas = set([robo])
-    passos_totais = 0
+def _caminho_mais_curto(mapa, origem, destino, marca, predecessor, busca):
+    """BFS de 'origem' a 'destino' com buffers reaproveitados (como em Fronteira); sem a origem."""
+    inicio, fim = mapa.index(origem), mapa.index(destino)
+    marca[inicio] = busca
+    fila = deque([inicio])
+    while fila:
+        atual = fila.popleft()
+        if atual == fim:
+            caminho = []
+            while atual != inicio:
+                caminho.append(mapa.cell(atual))
+                atual = predecessor[atual]
+            caminho.reverse()
+            return caminho
+        for vizinha in mapa.free_neighbors(atual):
+            if marca[vizinha] != busca:
+                marca[vizinha] = busca
+                predecessor[vizinha] = atual
+                fila.append(vizinha)
+    return None
 
-    plt.figure(figsize=(6, 6))
+def _ligar(alvos, mapa):
+    """Rota que passa por 'alvos' na ordem dada, ligando os não vizinhos pelo caminho mais curto."""
+    marca = array('l', [0]) * mapa.size
+    predecessor = array('l', [-1]) * mapa.size
+    rota = [alvos[0]]
+    for busca, alvo in enumerate(alvos[1:], 1):
+        atual = rota[-1]
+        if abs(alvo[0] - atual[0]) + abs(alvo[1] - atual[1]) == 1:
+            rota.append(alvo)
+        elif alvo != atual:
+            rota += _caminho_mais_curto(mapa, atual, alvo, marca, predecessor, busca)
+    return rota
 
-    while True:
-        plotar_grid(robo, visitadas)
+def _expandir(pontos):
+    """Todas as células dos segmentos retos entre pontos consecutivos (cada ponto incluso)."""
+    celulas = [pontos[0]]
+    for linha, coluna in pontos[1:]:
+        atual = celulas[-1]
+        passo_linha = (linha > atual[0]) - (linha < atual[0])
+        passo_coluna = (coluna > atual[1]) - (coluna < atual[1])
+        for _ in range(abs(linha - atual[0]) + abs(coluna - atual[1])):
+            atual = (atual[0] + passo_linha, atual[1] + passo_coluna)
+            celulas.append(atual)
+    return celulas
 
-        caminho = bfs(robo, visitadas)
+def planejar_cobertura(origem, mapa=MAPA):
+    """
+    Rota completa do planejador de cobertura: a região alcançável é decomposta em
+    células (decompor_boustrofedon), ordenadas por ordenar_celulas e varridas em
+    zigue-zague, cada faixa ligada à próxima pelo caminho mais curto. A rota é então
+    refeita ligando só a primeira visita de cada célula, o que nunca a alonga e pula o
+    que as ligações já cobriram. Tenta o corte por colunas e por linhas e fica com a
+    rota mais curta.
+    """
+    alcancavel = regiao_alcancavel(origem, mapa)
+    melhor = None
+    for por_linhas in (False, True):
+        alvos = [origem]
+        celulas = decompor_boustrofedon(alcancavel, por_linhas)
+        for _, _, segmentos, invertida in ordenar_celulas(celulas, origem, mapa, por_linhas):
+            if invertida:
+                segmentos = [(fim, inicio) for inicio, fim in reversed(segmentos)]
+            for segmento in segmentos:
+                alvos += _expandir(segmento)
+        rota = _ligar(list(dict.fromkeys(_ligar(alvos, mapa))), mapa)
+        if melhor is None or len(rota) < len(melhor):
+            melhor = rota
+    return melhor
 
-        if caminho is None:
+PLANEJADORES = {"guloso": explorar_guloso, "cobertura": planejar_cobertura}
+
+def mover_robo(headless=False, seed=None, frames=None, planejador="guloso", terminal=False):
+    """
+    Explora o grid com o 'planejador' escolhido em PLANEJADORES: "guloso" vai sempre
+    para a célula não visitada mais próxima, "cobertura" segue o plano de
+    planejar_cobertura. 'seed' torna o sorteio da posição inicial reprodutível,
+    'headless' roda sem desenhar (a janela roda em outro processo e nunca segura a
+    exploração), 'terminal' desenha no terminal e 'frames' salva cada passo em um
+    arquivo .npz.
+    Retorna as métricas da exploração.
+    """
+    rng = random.Random(seed)
+    while True:
+        robo = (rng.randint(0, N - 1), rng.randint(0, N - 1))
+        if MAPA.is_free(robo):
             break
 
-        for proxima in caminho[1:]:
-            robo = proxima
-            visitadas.add(robo)
-            passos_totais += 1
-            plotar_grid(robo, visitadas)
+    inicio = time.perf_counter()
+    rota = PLANEJADORES[planejador](robo)
+    tempo_planejamento = time.perf_counter() - inicio
 
-    celulas_acessiveis = N * N - len(obstaculos)
+    visitadas = MAPA.mask()
+    visitadas.add(robo)
+    passos_totais = 0
+    recorder = None
+    if frames:
+        mapa = np.zeros((N, N), dtype=np.int8)
+        mapa[MAPA.blocked.to_array()] = -1
+        mapa[robo] = 1
+        recorder = FrameRecorder(mapa)
+
+    tela = janela = None
+    if terminal:
+        tela = TerminalRenderer(np.where(MAPA.blocked.to_array(), BLOCKED, FREE))
+        tela.update(robo, [robo])
+    elif not headless:
+        janela = BackgroundRenderer(np.where(MAPA.blocked.to_array(), OBSTACULO, 0), CORES, VISITADA, figsize=(6, 6))
+        janela.push({"robo": (robo, ROBO)}, trail=[robo])
+
+    for proxima in rota[1:]:
+        robo = proxima
+        visitadas.add(robo)
+        passos_totais += 1
+        if recorder:
+            recorder.record(robo, [(robo, 1)])
+        if tela:
+            tela.mark([robo])
+            tela.move_robot(robo)
+            tela.draw()
+        elif janela:
+            janela.push({"robo": (robo, ROBO)}, trail=[robo])
+
+    celulas_acessiveis = MAPA.size - len(MAPA.blocked)
     completude = len(visitadas) / celulas_acessiveis * 100
 
-    plt.close()
+    if tela:
+        tela.close()
+    elif janela:
+        janela.close("Exploração concluída! Feche a janela para terminar.")
+    if recorder:
+        recorder.save(frames)
     print("✅ Exploração concluída!")
     print(f"Total de células acessíveis: {celulas_acessiveis}")
     print(f"Células visitadas: {len(visitadas)}")
     print(f"Completude: {completude:.2f}%")
     print(f"Passos totais: {passos_totais}")
     print(f"Passos redundantes: {passos_totais - len(visitadas)}")
+    print(f"Tempo de planejamento ({planejador}): {tempo_planejamento * 1000:.1f} ms")
     print("Sucesso no desvio:", "Sim" if completude == 100 else "Não")
+    return {
+        "celulas_acessiveis": celulas_acessiveis,
+        "visitadas": len(visitadas),
+        "completude": completude,
+        "passos_totais": passos_totais,
+        "passos_redundantes": passos_totais - len(visitadas),
+        "tempo_planejamento": tempo_planejamento,
+    }
+
+def opcoes_extras(parser):
+    parser.add_argument("--planejador", choices=list(PLANEJADORES), default="guloso", help="política de exploração")
+    parser.add_argument("--terminal", action="store_true", help="desenha no terminal (ANSI) em vez do matplotlib")
 
 if __name__ == "__main__":
-    mover_robo()
+    args = parse_run_args("Robô explorador com desvio de obstáculos", extra=opcoes_extras)
+    mover_robo(headless=args.headless, seed=args.seed, frames=args.frames, planejador=args.planejador,
+               terminal=args.terminal)
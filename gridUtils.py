@@ -0,0 +1,209 @@
+import os
+
+import numpy as np
+
+
+class CellMask:
+    """
+    Bit-packed set of grid cells, one bit per cell addressed by flat index
+    (row * cols + col). Search kernels use test/set on flat indices, which never
+    allocate; add/in/iter accept (row, col) tuples so a mask can stand in for
+    the sets of tuples the exercises used before.
+    """
+    __slots__ = ('rows', 'cols', 'bits', 'count')
+
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.bits = bytearray((rows * cols + 7) >> 3)
+        self.count = 0
+
+    @classmethod
+    def from_cells(cls, rows, cols, cells):
+        """Mask of 'cells'; cells outside the grid are ignored."""
+        mask = cls(rows, cols)
+        for row, col in cells:
+            if 0 <= row < rows and 0 <= col < cols:
+                mask.set(row * cols + col)
+        return mask
+
+    def test(self, index):
+        return self.bits[index >> 3] >> (index & 7) & 1
+
+    def set(self, index):
+        if not self.bits[index >> 3] >> (index & 7) & 1:
+            self.bits[index >> 3] |= 1 << (index & 7)
+            self.count += 1
+
+    def clear(self, index):
+        if self.bits[index >> 3] >> (index & 7) & 1:
+            self.bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+            self.count -= 1
+
+    def add(self, cell):
+        self.set(cell[0] * self.cols + cell[1])
+
+    def discard(self, cell):
+        self.clear(cell[0] * self.cols + cell[1])
+
+    def __contains__(self, cell):
+        row, col = cell
+        return 0 <= row < self.rows and 0 <= col < self.cols and bool(self.test(row * self.cols + col))
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for index in np.flatnonzero(self.to_array()):
+            yield divmod(int(index), self.cols)
+
+    def window(self, row, col, rows, cols):
+        """Mask of the rows x cols block whose top-left cell is (row, col)."""
+        mask = CellMask(rows, cols)
+        if not self.count:
+            return mask
+        block = np.zeros((rows, cols), dtype=np.uint8)
+        packed = np.frombuffer(self.bits, dtype=np.uint8)
+        for offset in range(rows):
+            start = (row + offset) * self.cols + col
+            chunk = np.unpackbits(packed[start >> 3:((start + cols + 7) >> 3) + 1], bitorder='little')
+            block[offset] = chunk[start & 7:(start & 7) + cols]
+        mask.bits = bytearray(np.packbits(block.reshape(-1), bitorder='little').tobytes())
+        mask.count = int(block.sum())
+        return mask
+
+    def to_array(self):
+        """The mask as a (rows, cols) boolean array."""
+        size = self.rows * self.cols
+        flat = np.unpackbits(np.frombuffer(self.bits, dtype=np.uint8), count=size, bitorder='little')
+        return flat.reshape(self.rows, self.cols).astype(bool)
+
+
+class GridMap:
+    """
+    Shared world representation for every exercise: a rows x cols grid with a
+    bit-packed obstacle mask and an optional contiguous cost array, addressed by
+    flat index so inner loops work on ints instead of (row, col) tuples.
+    Neighbours follow DIRECTIONS order: right, down, left, up. 'cache' holds views
+    derived from the costs by the searches (see searchUtils.integer_costs).
+    """
+    __slots__ = ('rows', 'cols', 'size', 'blocked', 'costs', 'cache')
+
+    def __init__(self, rows, cols, obstacles=(), costs=None):
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+        self.blocked = CellMask.from_cells(rows, cols, obstacles)
+        self.costs = None if costs is None else np.ascontiguousarray(costs, dtype=np.float64)
+        self.cache = {}
+
+    @classmethod
+    def from_costs(cls, grid_costs):
+        rows, cols = np.shape(grid_costs)
+        return cls(rows, cols, costs=grid_costs)
+
+    @classmethod
+    def from_npy(cls, path):
+        """
+        Cost map memory-mapped read-only from a 2-D .npy file, keeping its dtype, so
+        pages are only read from disk as the search touches them. Cells with a
+        non-finite cost (inf, nan) become obstacles; the map is scanned for them a
+        band of rows at a time.
+        """
+        costs = np.load(path, mmap_mode='r')
+        if costs.ndim != 2:
+            raise ValueError(f"{path} is not a 2-D cost map")
+        if not costs.flags.c_contiguous:
+            # A copy would pull the whole map into memory, defeating the memory map
+            raise ValueError(f"{path} is stored in Fortran order; save it C-ordered to memory-map it")
+        rows, cols = costs.shape
+        grid = cls(rows, cols)
+        grid.costs = costs
+        if np.issubdtype(costs.dtype, np.floating):
+            bits = np.frombuffer(grid.blocked.bits, dtype=np.uint8)
+            band = max(1, (1 << 22) // max(cols, 1))
+            for top in range(0, rows, band):
+                blocked = np.flatnonzero(~np.isfinite(costs[top:top + band])) + top * cols
+                np.bitwise_or.at(bits, blocked >> 3, (1 << (blocked & 7)).astype(np.uint8))
+                grid.blocked.count += len(blocked)
+        return grid
+
+    def window(self, row, col, rows, cols):
+        """
+        Standalone GridMap of the rows x cols block whose top-left cell is (row, col),
+        with its own copy of just that block's costs and obstacles.
+        """
+        sub = GridMap(rows, cols, costs=None if self.costs is None else self.costs[row:row + rows, col:col + cols])
+        sub.blocked = self.blocked.window(row, col, rows, cols)
+        return sub
+
+    def index(self, cell):
+        return cell[0] * self.cols + cell[1]
+
+    def cell(self, index):
+        return divmod(index, self.cols)
+
+    def in_bounds(self, cell):
+        return 0 <= cell[0] < self.rows and 0 <= cell[1] < self.cols
+
+    def is_free(self, cell):
+        return self.in_bounds(cell) and not self.blocked.test(self.index(cell))
+
+    def mask(self):
+        """An empty CellMask the size of this grid (visited cells, explored nodes...)."""
+        return CellMask(self.rows, self.cols)
+
+    def flat_costs(self):
+        """Zero-copy flat view of the costs, indexable by flat index."""
+        return memoryview(self.costs.reshape(-1))
+
+    def neighbors(self, index):
+        """Flat indices of the in-bounds neighbours of 'index', blocked or not."""
+        cols = self.cols
+        col = index % cols
+        if col + 1 < cols:
+            yield index + 1
+        if index + cols < self.size:
+            yield index + cols
+        if col > 0:
+            yield index - 1
+        if index >= cols:
+            yield index - cols
+
+    def free_neighbors(self, index):
+        """Flat indices of the neighbours of 'index' that are not obstacles."""
+        bits = self.blocked.bits
+        cols = self.cols
+        col = index % cols
+        neighbor = index + 1
+        if col + 1 < cols and not bits[neighbor >> 3] >> (neighbor & 7) & 1:
+            yield neighbor
+        neighbor = index + cols
+        if neighbor < self.size and not bits[neighbor >> 3] >> (neighbor & 7) & 1:
+            yield neighbor
+        neighbor = index - 1
+        if col > 0 and not bits[neighbor >> 3] >> (neighbor & 7) & 1:
+            yield neighbor
+        neighbor = index - cols
+        if neighbor >= 0 and not bits[neighbor >> 3] >> (neighbor & 7) & 1:
+            yield neighbor
+
+
+def cached_arrays(map_path, name, build, **settings):
+    """
+    Arrays derived from the .npy map at 'map_path', cached next to it as
+    '<map>.<name>.npz'. The cache is used only if it was made from the same map file
+    (size and mtime) and 'settings'; otherwise build() makes the dict of arrays,
+    which is saved along with them.
+    """
+    root, _ = os.path.splitext(map_path)
+    cached = f"{root}.{name}.npz"
+    stat = os.stat(map_path)
+    if os.path.exists(cached):
+        with np.load(cached) as data:
+            if (int(data["map_size"]) == stat.st_size and int(data["map_mtime"]) == stat.st_mtime_ns
+                    and all(int(data[key]) == value for key, value in settings.items())):
+                return {key: data[key] for key in data.files}
+    arrays = build()
+    np.savez(cached, map_size=stat.st_size, map_mtime=stat.st_mtime_ns, **settings, **arrays)
+    return arrays
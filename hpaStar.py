@@ -0,0 +1,227 @@
+import heapq
+from array import array
+
+import numpy as np
+
+from gridUtils import GridMap, cached_arrays
+from searchUtils import INF, cost_field, find_path_a_star
+
+DEFAULT_CLUSTER_SIZE = 32
+# Free runs along a cluster border at least this long get a transition at each end, shorter ones one in the middle
+LONG_ENTRANCE = 6
+# Long runs also get one every ENTRANCE_SPACING cells in between, so weighted terrain has crossings to pick from
+ENTRANCE_SPACING = 8
+
+
+class HierarchicalMap:
+    """
+    HPA* abstraction of a cost grid. The grid is cut into cluster_size x cluster_size
+    clusters and every run of free cells along a cluster border becomes one or two
+    transitions (pairs of facing cells). The abstract graph links facing transitions
+    (one step) and the transitions of each cluster (their cheapest path inside it).
+    Queries plan on that graph and refine each abstract edge with find_path_a_star on
+    the cluster it crosses, so only the clusters on the route are searched cell by
+    cell. Paths are exact inside each cluster but may only cross borders at
+    transitions, so their cost can be slightly above the optimum.
+    """
+
+    def __init__(self, grid, cluster_size, nodes, cluster_offsets, offsets, targets, costs):
+        self.grid = grid
+        self.cluster_size = cluster_size
+        self.cluster_cols = -(-grid.cols // cluster_size)
+        # Abstract nodes are flat cell indices sorted by cluster; edges are in CSR form
+        self.nodes = nodes
+        self.cluster_offsets = cluster_offsets
+        self.offsets = offsets
+        self.targets = targets
+        self.costs = costs
+
+    @classmethod
+    def build(cls, grid, cluster_size=DEFAULT_CLUSTER_SIZE, entrance_spacing=ENTRANCE_SPACING):
+        """Finds the transitions of 'grid' and their entrance-to-entrance costs."""
+        rows, cols = grid.rows, grid.cols
+        cluster_rows, cluster_cols = -(-rows // cluster_size), -(-cols // cluster_size)
+        blocked = grid.blocked
+        transitions = []
+
+        def add_border(pairs):
+            run = []
+            for pair in pairs + [None]:
+                if pair is not None and not blocked.test(pair[0]) and not blocked.test(pair[1]):
+                    run.append(pair)
+                    continue
+                if len(run) >= LONG_ENTRANCE:
+                    transitions.extend(run[:-1:entrance_spacing] + [run[-1]])
+                elif run:
+                    transitions.append(run[len(run) // 2])
+                run = []
+
+        for border in range(cluster_size, cols, cluster_size):
+            for top in range(0, rows, cluster_size):
+                add_border([(r * cols + border - 1, r * cols + border) for r in range(top, min(top + cluster_size, rows))])
+        for border in range(cluster_size, rows, cluster_size):
+            for left in range(0, cols, cluster_size):
+                add_border([((border - 1) * cols + c, border * cols + c) for c in range(left, min(left + cluster_size, cols))])
+
+        def cluster_of(cell):
+            row, col = divmod(cell, cols)
+            return (row // cluster_size) * cluster_cols + col // cluster_size
+
+        cells = sorted({cell for pair in transitions for cell in pair}, key=lambda cell: (cluster_of(cell), cell))
+        node_ids = {cell: node for node, cell in enumerate(cells)}
+        cluster_offsets = np.zeros(cluster_rows * cluster_cols + 1, dtype=np.int64)
+        np.add.at(cluster_offsets, [cluster_of(cell) + 1 for cell in cells], 1)
+        cluster_offsets = np.cumsum(cluster_offsets)
+
+        flat_costs = grid.costs.reshape(-1)
+        sources, destinations, edge_costs = [], [], []
+        for a, b in transitions:
+            sources += [node_ids[a], node_ids[b]]
+            destinations += [node_ids[b], node_ids[a]]
+            edge_costs += [float(flat_costs[b]), float(flat_costs[a])]
+
+        hierarchy = cls(grid, cluster_size, np.array(cells, dtype=np.int64), cluster_offsets, None, None, None)
+        for cluster in range(cluster_rows * cluster_cols):
+            members = cells[cluster_offsets[cluster]:cluster_offsets[cluster + 1]]
+            if len(members) < 2:
+                continue
+            window, (top, left) = hierarchy._window(cluster)
+            local = [(cell // cols - top) * window.cols + cell % cols - left for cell in members]
+            for i, u in enumerate(members[:-1]):
+                distances = cost_field(window, divmod(local[i], window.cols), targets=local[i + 1:])
+                for j in range(i + 1, len(members)):
+                    distance = distances[local[j]]
+                    if distance < INF:
+                        v = members[j]
+                        # The reversed path enters the same cells except v, plus u
+                        sources += [node_ids[u], node_ids[v]]
+                        destinations += [node_ids[v], node_ids[u]]
+                        edge_costs += [distance, distance - float(flat_costs[v]) + float(flat_costs[u])]
+
+        sources = np.array(sources, dtype=np.int64)
+        order = np.argsort(sources, kind='stable')
+        hierarchy.offsets = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=len(cells))))).astype(np.int64)
+        hierarchy.targets = np.array(destinations, dtype=np.int64)[order]
+        hierarchy.costs = np.array(edge_costs, dtype=np.float64)[order]
+        return hierarchy
+
+    @classmethod
+    def load(cls, map_path, cluster_size=DEFAULT_CLUSTER_SIZE):
+        """
+        Memory-maps the .npy cost map at 'map_path' and loads its abstraction from the
+        cache file next to it, building and saving it first if the cache is missing or
+        was made from a different map file or settings.
+        """
+        grid = GridMap.from_npy(map_path)
+        data = cached_arrays(map_path, f"hpa{cluster_size}", lambda: cls.build(grid, cluster_size).arrays(),
+                             cluster_size=cluster_size, entrance_spacing=ENTRANCE_SPACING)
+        return cls(grid, cluster_size, data["nodes"], data["cluster_offsets"],
+                   data["offsets"], data["targets"], data["costs"])
+
+    def arrays(self):
+        """The abstract graph as named arrays, as stored in the cache file."""
+        return {
+            "nodes": self.nodes,
+            "cluster_offsets": self.cluster_offsets,
+            "offsets": self.offsets,
+            "targets": self.targets,
+            "costs": self.costs,
+        }
+
+    def _cluster(self, cell):
+        return (cell[0] // self.cluster_size) * self.cluster_cols + cell[1] // self.cluster_size
+
+    def _window(self, cluster):
+        """The GridMap of one cluster and the (row, col) of its top-left cell."""
+        size = self.cluster_size
+        top, left = divmod(cluster, self.cluster_cols)
+        top, left = top * size, left * size
+        rows, cols = min(size, self.grid.rows - top), min(size, self.grid.cols - left)
+        return self.grid.window(top, left, rows, cols), (top, left)
+
+    def _members(self, cluster):
+        return range(self.cluster_offsets[cluster], self.cluster_offsets[cluster + 1])
+
+    def _local_costs(self, cell):
+        """Cheapest in-cluster cost from 'cell' to each transition of its cluster, as (node, cost) pairs."""
+        window, (top, left) = self._window(self._cluster(cell))
+        members = self._members(self._cluster(cell))
+        local = [(self.nodes[node] // self.grid.cols - top) * window.cols + self.nodes[node] % self.grid.cols - left
+                 for node in members]
+        distances = cost_field(window, (cell[0] - top, cell[1] - left), targets=local)
+        return [(node, distances[index]) for node, index in zip(members, local) if distances[index] < INF]
+
+    def find_path(self, start, goal):
+        """
+        Plans from 'start' to 'goal' on the abstract graph and refines it into a list
+        of (row, col) tuples, or returns None if the goal is unreachable.
+        """
+        grid = self.grid
+        cols = grid.cols
+        if start == goal:
+            return [start]
+        if not grid.is_free(goal):
+            return None
+
+        nodes, offsets, targets, costs = (memoryview(a) for a in (self.nodes, self.offsets, self.targets, self.costs))
+        start_id, goal_id = len(self.nodes), len(self.nodes) + 1
+        goal_cost = float(grid.costs[goal])
+        # Temporary nodes for the query: start links to its cluster's transitions, those link to the goal
+        start_edges = self._local_costs(start)
+        goal_edges = {node: distance - float(grid.costs[divmod(nodes[node], cols)]) + goal_cost
+                      for node, distance in self._local_costs(goal)}
+        if self._cluster(start) == self._cluster(goal):
+            window, (top, left) = self._window(self._cluster(start))
+            local_goal = (goal[0] - top) * window.cols + goal[1] - left
+            direct = cost_field(window, (start[0] - top, start[1] - left), targets=[local_goal])[local_goal]
+            if direct < INF:
+                start_edges.append((goal_id, direct))
+
+        def position(node):
+            return start if node == start_id else goal if node == goal_id else divmod(nodes[node], cols)
+
+        goal_r, goal_c = goal
+        g_score = array('d', [INF]) * (goal_id + 1)
+        came_from = array('q', [-1]) * (goal_id + 1)
+        closed = bytearray(goal_id + 1)
+        g_score[start_id] = 0
+        open_set = [(0, start_id)]
+        while open_set:
+            _, current = heapq.heappop(open_set)
+            if closed[current]:
+                continue
+            if current == goal_id:
+                break
+            closed[current] = 1
+            if current == start_id:
+                edges = start_edges
+            else:
+                edges = zip(targets[offsets[current]:offsets[current + 1]], costs[offsets[current]:offsets[current + 1]])
+                if current in goal_edges:
+                    edges = list(edges) + [(goal_id, goal_edges[current])]
+            current_g = g_score[current]
+            for neighbor, cost in edges:
+                tentative_g_score = current_g + cost
+                if not closed[neighbor] and tentative_g_score < g_score[neighbor]:
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g_score
+                    row, col = position(neighbor)
+                    heapq.heappush(open_set, (tentative_g_score + abs(row - goal_r) + abs(col - goal_c), neighbor))
+        if g_score[goal_id] == INF:
+            return None
+
+        abstract = [goal_id]
+        while abstract[-1] != start_id:
+            abstract.append(came_from[abstract[-1]])
+        waypoints = [position(node) for node in reversed(abstract)]
+
+        path = [start]
+        for u, v in zip(waypoints, waypoints[1:]):
+            cluster = self._cluster(u)
+            if cluster != self._cluster(v):
+                path.append(v)
+                continue
+            window, (top, left) = self._window(cluster)
+            segment = find_path_a_star(window, (u[0] - top, u[1] - left), (v[0] - top, v[1] - left))
+            path.extend((row + top, col + left) for row, col in segment[1:])
+        return path
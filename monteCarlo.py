@@ -0,0 +1,199 @@
+import argparse
+import contextlib
+import csv
+import io
+import math
+import os
+import random
+from multiprocessing import Pool
+
+import exerciseFour
+import exerciseFour_parcial
+import exerciseThree
+import exerciseTwo
+from searchUtils import find_path_a_star
+
+FIELDS = ["scenario", "seed", "success", "steps", "cost", "optimal_cost", "optimality_gap",
+          "completeness", "redundant_steps"]
+
+
+def _exploration(seed):
+    metrics = exerciseTwo.mover_robo(headless=True, seed=seed)
+    return {
+        "success": metrics["completude"] == 100,
+        "steps": metrics["passos_totais"],
+        "completeness": metrics["completude"],
+        "redundant_steps": metrics["passos_redundantes"],
+    }
+
+
+def _path_stage(with_obstacles):
+    def run(seed):
+        metrics = exerciseThree.run_stage(with_obstacles, headless=True, seed=seed)
+        return {"success": metrics["success"], "steps": metrics["path_length"], "cost": metrics["path_length"]}
+    return run
+
+
+def _full(seed):
+    metrics = exerciseFour.run_stage(headless=True, seed=seed)
+    return {"success": metrics["success"], "steps": metrics["path_length"], "cost": metrics["total_cost"],
+            "optimal_cost": metrics["total_cost"], "optimality_gap": 0.0 if metrics["success"] else None}
+
+
+def _partial(seed):
+    metrics = exerciseFour_parcial.run_stage(headless=True, seed=seed)
+    # Same draw run_stage made, planned with full knowledge of the terrain
+    start_node, goal_node = exerciseFour_parcial.generate_distant_nodes(random.Random(seed))
+    grid = exerciseFour_parcial.REAL_GRID_COSTS
+    optimal_path = find_path_a_star(exerciseFour_parcial.REAL_GRID, start_node, goal_node)
+    optimal_cost = int(sum(grid[r, c] for r, c in optimal_path[1:]))
+    return {
+        "success": metrics["success"],
+        "steps": metrics["steps"],
+        "cost": metrics["total_cost"],
+        "optimal_cost": optimal_cost,
+        "optimality_gap": metrics["total_cost"] / optimal_cost - 1 if metrics["success"] else None,
+    }
+
+
+SCENARIOS = {
+    "exploration": _exploration,
+    "free": _path_stage(False),
+    "obstacles": _path_stage(True),
+    "full": _full,
+    "partial": _partial,
+}
+
+
+def run_trial(task):
+    """Runs one seeded trial headless with its console output silenced and returns its record."""
+    scenario, seed = task
+    with contextlib.redirect_stdout(io.StringIO()):
+        record = SCENARIOS[scenario](seed)
+    return dict({field: None for field in FIELDS}, scenario=scenario, seed=seed, **record)
+
+
+class CsvSink:
+    def __init__(self, path):
+        self.file = open(path, "w", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=FIELDS)
+        self.writer.writeheader()
+
+    def write(self, record):
+        self.writer.writerow(record)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    """Writes records in row groups of 'batch_size'; needs pyarrow."""
+
+    def __init__(self, path, batch_size=1000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as error:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)") from error
+        self.pa = pa
+        self.schema = pa.schema([
+            ("scenario", pa.string()), ("seed", pa.int64()), ("success", pa.bool_()),
+            ("steps", pa.int64()), ("cost", pa.float64()), ("optimal_cost", pa.float64()),
+            ("optimality_gap", pa.float64()), ("completeness", pa.float64()), ("redundant_steps", pa.int64()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.batch_size = batch_size
+        self.batch = []
+
+    def write(self, record):
+        self.batch.append(record)
+        if len(self.batch) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self.batch:
+            self.writer.write_table(self.pa.Table.from_pylist(self.batch, schema=self.schema))
+            self.batch = []
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+
+def open_sink(path):
+    if path is None:
+        return None
+    return ParquetSink(path) if path.endswith(".parquet") else CsvSink(path)
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of 'values' (q in 0-100)."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def summarize(records):
+    """Aggregates trial records into per-scenario summary statistics."""
+    summary = {}
+    for scenario in SCENARIOS:
+        rows = [record for record in records if record["scenario"] == scenario]
+        if not rows:
+            continue
+        steps = [row["steps"] for row in rows if row["steps"] is not None]
+        costs = [row["cost"] for row in rows if row["cost"] is not None]
+        gaps = [row["optimality_gap"] for row in rows if row["optimality_gap"] is not None]
+        stats = {
+            "trials": len(rows),
+            "success_rate": sum(bool(row["success"]) for row in rows) / len(rows),
+            "mean_cost": sum(costs) / len(costs) if costs else None,
+            "mean_steps": sum(steps) / len(steps) if steps else None,
+            "p95_steps": percentile(steps, 95) if steps else None,
+        }
+        for field in ("completeness", "redundant_steps"):
+            values = [row[field] for row in rows if row[field] is not None]
+            if values:
+                stats[f"mean_{field}"] = sum(values) / len(values)
+        if gaps:
+            stats["mean_optimality_gap"] = sum(gaps) / len(gaps)
+            stats["max_optimality_gap"] = max(gaps)
+        summary[scenario] = stats
+    return summary
+
+
+def run_trials(scenarios, trials, base_seed=0, workers=None, output=None, chunksize=16):
+    """
+    Runs 'trials' seeded trials of every scenario across a process pool, streaming each
+    record to 'output' (.csv or .parquet) as it arrives. Returns the summary statistics.
+    """
+    tasks = [(scenario, base_seed + i) for scenario in scenarios for i in range(trials)]
+    sink = open_sink(output)
+    records = []
+    try:
+        with Pool(workers) as pool:
+            for record in pool.imap_unordered(run_trial, tasks, chunksize=chunksize):
+                records.append(record)
+                if sink:
+                    sink.write(record)
+    finally:
+        if sink:
+            sink.close()
+    return summarize(records)
+
+
+def print_summary(summary):
+    for scenario, stats in summary.items():
+        print(f"--- {scenario} ({stats['trials']} trials) ---")
+        for name, value in stats.items():
+            if name != "trials":
+                print(f"  - {name}: {value if value is None else round(value, 4)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo evaluation of every exercise")
+    parser.add_argument("--trials", type=int, default=1000, help="trials per scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first trial")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default=None, help="per-trial records, .csv or .parquet")
+    args = parser.parse_args()
+    print_summary(run_trials(args.scenarios, args.trials, args.seed, args.workers, args.output))
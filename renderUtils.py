@@ -0,0 +1,174 @@
+import multiprocessing
+import queue
+
+import numpy as np
+
+
+def palette_lut(palette):
+    """Parses a list of '#rrggbb' colours once into an (n, 3) float lookup table."""
+    return np.array([[int(color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4)] for color in palette]) / 255.0
+
+
+class GridRenderer:
+    """
+    Keeps one persistent image of a grid of palette codes and repaints only the cells
+    that change between frames. A cell shows, in order of precedence, the last marker
+    placed on it (robot, start, goal...), the trail code if the cell is on the trail,
+    or its terrain code.
+    """
+
+    def __init__(self, terrain_codes, palette, trail_code, title=None, figsize=(7, 7)):
+        import matplotlib.pyplot as plt
+        self.plt = plt
+        self.lut = palette_lut(palette)
+        self.terrain = np.array(terrain_codes, dtype=np.intp)
+        self.trail = np.zeros(self.terrain.shape, dtype=bool)
+        self.trail_code = trail_code
+        self.markers = {}
+        self.rgb = self.lut[self.terrain]
+
+        rows, cols = self.terrain.shape
+        plt.figure(figsize=figsize)
+        self.image = plt.imshow(self.rgb)
+        if title:
+            plt.title(title)
+        plt.grid(True, which='both', color='k', linewidth=0.5)
+        plt.xticks(np.arange(-.5, cols, 1), [])
+        plt.yticks(np.arange(-.5, rows, 1), [])
+
+    def _repaint(self, cells):
+        if not cells:
+            return
+        rows, cols = np.array(list(cells), dtype=np.intp).reshape(-1, 2).T
+        codes = np.where(self.trail[rows, cols], self.trail_code, self.terrain[rows, cols])
+        for cell, code in self.markers.values():
+            codes[(rows == cell[0]) & (cols == cell[1])] = code
+        self.rgb[rows, cols] = self.lut[codes]
+
+    def set_terrain(self, cells, codes):
+        """Changes the terrain code of 'cells' (a list of (row, col)) to the matching 'codes'."""
+        cells = list(cells)
+        if cells:
+            rows, cols = np.array(cells, dtype=np.intp).T
+            self.terrain[rows, cols] = codes
+        self._repaint(cells)
+
+    def mark_trail(self, cells):
+        cells = list(cells)
+        for cell in cells:
+            self.trail[cell] = True
+        self._repaint(cells)
+
+    def move_marker(self, name, cell, code):
+        """Places marker 'name' on 'cell', restoring whatever was under its previous cell."""
+        previous = self.markers.pop(name, None)
+        self.markers[name] = (cell, code)
+        self._repaint([cell] if previous is None else [previous[0], cell])
+
+    def remove_marker(self, name):
+        previous = self.markers.pop(name, None)
+        if previous is not None:
+            self._repaint([previous[0]])
+
+    def draw(self, pause, title=None):
+        """Pushes the patched pixels into the existing image artist and waits 'pause' seconds."""
+        self.image.set_data(self.rgb)
+        if title:
+            self.plt.title(title)
+        self.plt.pause(pause)
+
+    def show(self, title=None):
+        self.image.set_data(self.rgb)
+        if title:
+            self.plt.title(title)
+        self.plt.show()
+
+    def close(self):
+        self.plt.close()
+
+
+def _render_loop(snapshots, terrain_codes, palette, trail_code, title, figsize, pause):
+    """Body of the BackgroundRenderer process: applies snapshots to a GridRenderer until the closing one."""
+    renderer = GridRenderer(terrain_codes, palette, trail_code, title, figsize)
+    while True:
+        markers, trail, terrain = snapshots.get()
+        if markers is None:
+            # Closing snapshot: 'trail' holds the final title, if any
+            if trail:
+                renderer.show(trail)
+            else:
+                renderer.close()
+            return
+        renderer.set_terrain([cell for cell, _ in terrain], [code for _, code in terrain])
+        renderer.mark_trail(trail)
+        for name, marker in markers.items():
+            if marker is None:
+                renderer.remove_marker(name)
+            else:
+                renderer.move_marker(name, *marker)
+        renderer.draw(pause)
+
+
+class BackgroundRenderer:
+    """
+    GridRenderer running in its own process, so the agent loop never waits on
+    matplotlib. Each push sends a snapshot of what changed in a step (markers moved,
+    trail cells, terrain codes) through a bounded queue; when the window falls
+    behind and the queue is full, snapshots are merged into the next one instead of
+    blocking, so intermediate frames are dropped but nothing drawn is lost.
+    """
+
+    def __init__(self, terrain_codes, palette, trail_code, title=None, figsize=(7, 7), pause=0.05, maxsize=2):
+        context = multiprocessing.get_context()
+        self.snapshots = context.Queue(maxsize)
+        self.pending = None
+        self.dropped = 0
+        self.process = context.Process(
+            target=_render_loop,
+            args=(self.snapshots, np.array(terrain_codes), palette, trail_code, title, figsize, pause),
+            daemon=True,
+        )
+        self.process.start()
+
+    def push(self, markers=None, trail=(), terrain=()):
+        """
+        Queues one step: 'markers' maps a marker name to its new (cell, code), or to None
+        to remove it; 'trail' lists cells to mark; 'terrain' lists (cell, code) changes.
+        Snapshots are dropped once the window process is gone.
+        """
+        if not self.process.is_alive():
+            # Window closed early or crashed: nobody will draw the snapshot
+            self.pending = None
+            self.dropped += 1
+            return
+        snapshot = ({} if markers is None else dict(markers), list(trail), list(terrain))
+        if self.pending is not None:
+            self.pending[0].update(snapshot[0])
+            self.pending[1].extend(snapshot[1])
+            self.pending[2].extend(snapshot[2])
+            snapshot = self.pending
+            self.dropped += 1
+        try:
+            self.snapshots.put_nowait(snapshot)
+            self.pending = None
+        except queue.Full:
+            self.pending = snapshot
+
+    def close(self, title=None):
+        """
+        Sends what is still pending and waits for the window: with a 'title' it stays
+        open on the last frame until the user closes it, otherwise it closes at once.
+        """
+        closing = [(None, title, None)]
+        if self.pending is not None:
+            closing.insert(0, self.pending)
+            self.pending = None
+        for snapshot in closing:
+            # Gives up if the window process is gone (closed early or crashed)
+            while self.process.is_alive():
+                try:
+                    self.snapshots.put(snapshot, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+        self.process.join()
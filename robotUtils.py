@@ -1,14 +1,188 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from gridUtils import CellMask
+
+
+ROBOT = "🤖"
+NOT_LANDED = "🟩"
+LANDED = "🔴"
+OBSTACLE = "⬛"
+# Symbol of each TerminalRenderer code; print_matrix draws the first three
+SYMBOLS = (NOT_LANDED, LANDED, ROBOT, OBSTACLE)
+FREE, TRAIL, AGENT, BLOCKED = range(4)
+
+
 def print_matrix(matrix_size, robot_pos, landed_positions):
-    ROBOT = "🤖"
-    NOT_LANDED = "🟩"
-    LANDED = "🔴"
+    if not isinstance(landed_positions, CellMask):
+        landed_positions = CellMask.from_cells(matrix_size, matrix_size, landed_positions)
+    robot_index = robot_pos[0] * matrix_size + robot_pos[1]
     for row in range(matrix_size):
-        line = ""
-        for col in range(matrix_size):
-            if (row, col) == robot_pos:
-                line += ROBOT + " "
-            elif (row, col) in landed_positions:
-                line += LANDED + " "
-            else:
-                line += NOT_LANDED + " "
-        print(line.rstrip())
+        start = row * matrix_size
+        print(" ".join(
+            ROBOT if index == robot_index else LANDED if landed_positions.test(index) else NOT_LANDED
+            for index in range(start, start + matrix_size)
+        ))
+
+
+class TerminalRenderer:
+    """
+    Live view of a grid in an ANSI terminal, in the layout of print_matrix. The
+    first frame is drawn in full; after that only the cells whose code changed
+    since the last drawn frame are rewritten, each with a cursor move, and frames
+    requested faster than 'fps' are skipped (their changes go out with the next
+    one), so a step costs a few bytes no matter the grid size.
+    """
+
+    def __init__(self, codes, symbols=SYMBOLS, fps=20, stream=None):
+        self.codes = np.array(codes, dtype=np.intp)
+        self.symbols = symbols
+        self.interval = 1 / fps if fps else 0
+        self.stream = stream or sys.stdout
+        self.shown = None
+        self.dirty = set()
+        self.robot = None
+        self.last_draw = -np.inf
+
+    def mark(self, cells, code=TRAIL):
+        """Sets the code of 'cells', a list of (row, col); a cell under the robot keeps showing it."""
+        for cell in cells:
+            self.codes[cell] = code
+            self.dirty.add(cell)
+
+    def move_robot(self, cell):
+        if self.robot is not None:
+            self.dirty.add(self.robot)
+        self.robot = cell
+        self.dirty.add(cell)
+
+    def update(self, robot_pos, landed_positions):
+        """Same arguments as print_matrix: marks every landed cell and moves the robot, then draws."""
+        if isinstance(landed_positions, CellMask):
+            landed = landed_positions.to_array()
+        else:
+            landed = np.zeros(self.codes.shape, dtype=bool)
+            for cell in landed_positions:
+                landed[cell] = True
+        changed = landed & (self.codes == FREE)
+        self.codes[changed] = TRAIL
+        self.dirty.update(map(tuple, np.argwhere(changed).tolist()))
+        self.move_robot(tuple(robot_pos))
+        return self.draw()
+
+    def _code(self, cell):
+        return AGENT if cell == self.robot else self.codes[cell]
+
+    def draw(self, force=False):
+        """Writes the pending changes; returns False if the frame was skipped by the frame rate limit."""
+        now = time.perf_counter()
+        if not force and now - self.last_draw < self.interval:
+            return False
+        self.last_draw = now
+        symbols = self.symbols
+        if self.shown is None:
+            self.shown = self.codes.copy()
+            if self.robot is not None:
+                self.shown[self.robot] = AGENT
+            rows = (" ".join(symbols[code] for code in row) for row in self.shown.tolist())
+            self.stream.write("\x1b[?25l\x1b[2J\x1b[H" + "\n".join(rows))
+        else:
+            out = []
+            for row, col in sorted(self.dirty):
+                code = self._code((row, col))
+                if self.shown[row, col] != code:
+                    self.shown[row, col] = code
+                    # Every cell is a double-width symbol plus a space: three columns
+                    out.append(f"\x1b[{row + 1};{3 * col + 1}H{symbols[code]}")
+            self.stream.write("".join(out))
+        self.dirty.clear()
+        self.stream.flush()
+        return True
+
+    def close(self):
+        """Draws the last frame and leaves the cursor, visible again, below the grid."""
+        self.draw(force=True)
+        self.stream.write(f"\x1b[{self.codes.shape[0] + 1};1H\x1b[?25h\n")
+        self.stream.flush()
+
+
+def parse_run_args(description, seeded=True, extra=None):
+    """
+    Command-line options shared by every exercise entry point;
+    'extra' may add module-specific options to the parser.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--headless", action="store_true",
+                        help="run the simulation at full speed without opening a window")
+    if seeded:
+        parser.add_argument("--seed", type=int, default=None,
+                            help="seed for the random start/goal draws")
+    parser.add_argument("--frames", default=None,
+                        help="save every step to this .npz file for later playback")
+    if extra:
+        extra(parser)
+    return parser.parse_args()
+
+
+class FrameRecorder:
+    """
+    Records a run as the agent position per step plus the grid cells that changed
+    in that step, so a whole run costs a few bytes per frame on disk.
+    """
+
+    def __init__(self, base_grid):
+        self.base_grid = np.array(base_grid)
+        self.positions = []
+        self.offsets = [0]
+        self.cells = []
+        self.values = []
+
+    def record(self, position, changed=()):
+        """Stores one frame; 'changed' is an iterable of ((row, col), value) pairs."""
+        self.positions.append(position)
+        for cell, value in changed:
+            self.cells.append(cell)
+            self.values.append(value)
+        self.offsets.append(len(self.cells))
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            base_grid=self.base_grid,
+            positions=np.array(self.positions, dtype=np.int32).reshape(-1, 2),
+            offsets=np.array(self.offsets, dtype=np.int64),
+            cells=np.array(self.cells, dtype=np.int32).reshape(-1, 2),
+            values=np.array(self.values, dtype=self.base_grid.dtype),
+        )
+
+
+def load_frames(path):
+    """Yields (position, grid) for every recorded frame, applying the stored changes in order."""
+    data = np.load(path)
+    grid = data["base_grid"].copy()
+    positions, offsets, cells, values = data["positions"], data["offsets"], data["cells"], data["values"]
+    for frame, position in enumerate(positions):
+        start, end = offsets[frame], offsets[frame + 1]
+        grid[cells[start:end, 0], cells[start:end, 1]] = values[start:end]
+        yield (int(position[0]), int(position[1])), grid
+
+
+def play_frames(path, interval=0.1, cmap="viridis"):
+    """Plays back a recording made with FrameRecorder."""
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=(6, 6))
+    for (row, col), grid in load_frames(path):
+        plt.imshow(grid, cmap=cmap)
+        plt.plot(col, row, "o", color="#0077b6", markersize=12)
+        plt.xticks([])
+        plt.yticks([])
+        plt.pause(interval)
+        plt.clf()
+    plt.close()
+
+
+if __name__ == "__main__":
+    play_frames(sys.argv[1])
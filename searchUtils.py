@@ -0,0 +1,454 @@
+import heapq
+import json
+from array import array
+from time import perf_counter
+
+import numpy as np
+
+from gridUtils import GridMap
+
+INF = float('inf')
+# Largest cell cost the bucket-queue A* takes; above it the buckets outgrow the heap's advantage
+DIAL_MAX_COST = 64
+
+
+class SearchStats:
+    """
+    Counters collected by the searches that take a 'stats' argument (exerciseTwo.bfs,
+    exerciseThree.find_path_bfs, find_path_a_star). Each query adds its counts, so one
+    object aggregates a whole run, and '+' merges runs (e.g. from different processes
+    or JSON files). 'callback', if given, is called with every query's own counts.
+    The searches keep their counters in locals and report once at the end, so
+    passing no stats object costs a few integer additions per query.
+    """
+    FIELDS = ('queries', 'expansions', 'pushes', 'pops', 'stale_pops', 'peak_open', 'cache_hits', 'wall_time')
+
+    def __init__(self, callback=None, **counts):
+        self.callback = callback
+        for field in self.FIELDS:
+            setattr(self, field, counts.get(field, 0))
+
+    def record(self, wall_time, expansions=0, pushes=0, pops=0, stale_pops=0, peak_open=0, cache_hits=0):
+        """Adds one query's counters (peak_open keeps the maximum)."""
+        self.queries += 1
+        self.expansions += expansions
+        self.pushes += pushes
+        self.pops += pops
+        self.stale_pops += stale_pops
+        self.peak_open = max(self.peak_open, peak_open)
+        self.cache_hits += cache_hits
+        self.wall_time += wall_time
+        if self.callback:
+            self.callback({'queries': 1, 'expansions': expansions, 'pushes': pushes, 'pops': pops,
+                           'stale_pops': stale_pops, 'peak_open': peak_open, 'cache_hits': cache_hits,
+                           'wall_time': wall_time})
+
+    def __add__(self, other):
+        merged = SearchStats(**self.to_dict())
+        for field in self.FIELDS:
+            setattr(merged, field, getattr(self, field) + getattr(other, field))
+        merged.peak_open = max(self.peak_open, other.peak_open)
+        return merged
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def to_json(self, path=None):
+        """The counters as a JSON string, also written to 'path' when given."""
+        text = json.dumps(self.to_dict(), indent=2)
+        if path:
+            with open(path, 'w') as file:
+                file.write(text)
+        return text
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path) as file:
+            return cls(**json.load(file))
+
+    def __repr__(self):
+        return f"SearchStats({', '.join(f'{field}={getattr(self, field)}' for field in self.FIELDS)})"
+
+
+def reconstruct_flat_path(came_from, start, goal, cols):
+    """Walks 'came_from' back from 'goal' and returns the path as a list of (row, col) tuples."""
+    path = []
+    current = goal
+    while current != start:
+        path.append(divmod(current, cols))
+        current = came_from[current]
+    path.append(divmod(start, cols))
+    return path[::-1]
+
+
+def as_grid_map(grid_costs):
+    """Accepts a GridMap or a 2-D cost array (wrapped without copying when already float64)."""
+    return grid_costs if isinstance(grid_costs, GridMap) else GridMap.from_costs(grid_costs)
+
+
+def cost_field(grid_costs, source, targets=None):
+    """
+    Dijkstra from 'source' (a (row, col)): the cheapest cost to reach every cell, as a
+    flat array('d') with INF where unreachable, entering a cell costing its value.
+    With 'targets' (flat indices) the search stops once all of them are settled.
+    """
+    grid = as_grid_map(grid_costs)
+    cols, size = grid.cols, grid.size
+    costs = grid.flat_costs()
+    blocked = grid.blocked.bits
+
+    distances = array('d', [INF]) * size
+    closed = bytearray(size)
+    source_index = source[0] * cols + source[1]
+    distances[source_index] = 0
+    open_set = [(0, source_index)]
+    targets = set(targets) if targets is not None else ()
+    remaining = len(targets) if targets else -1
+
+    while open_set:
+        distance, current = heapq.heappop(open_set)
+        if closed[current]:
+            continue
+        closed[current] = 1
+        if remaining > 0 and current in targets:
+            remaining -= 1
+            if not remaining:
+                break
+        for neighbor in grid.neighbors(current):
+            if closed[neighbor] or blocked[neighbor >> 3] >> (neighbor & 7) & 1:
+                continue
+            tentative = distance + costs[neighbor]
+            if tentative < distances[neighbor]:
+                distances[neighbor] = tentative
+                heapq.heappush(open_set, (tentative, neighbor))
+    return distances
+
+
+def integer_costs(grid, limit=DIAL_MAX_COST):
+    """
+    The costs of 'grid' as a flat int64 memoryview if every free cell costs a whole
+    number from 1 to 'limit' (obstacles may hold anything), else None.
+    The answer is computed once and kept in grid.cache until grid.costs is replaced
+    or the obstacle count changes; clear the cache after editing costs in place.
+    """
+    if grid.costs is None:
+        return None
+    key = (limit, grid.blocked.count)
+    cached = grid.cache.get('integer_costs')
+    if cached is not None and cached[0] is grid.costs and cached[1] == key:
+        return cached[2]
+    costs = np.asarray(grid.costs).reshape(-1)
+    if grid.blocked.count:
+        costs = np.where(grid.blocked.to_array().reshape(-1), 1, costs)
+    view = None
+    if np.all(costs >= 1) and np.all(costs <= limit) and np.all(costs == np.floor(costs)):
+        view = memoryview(costs.astype(np.int64))
+    grid.cache['integer_costs'] = (grid.costs, key, view)
+    return view
+
+
+def wavefront_field(grid_costs, source):
+    """
+    BFS step counts from 'source' to every cell (flat int32 array, -1 where
+    unreachable), computed a whole frontier at a time instead of a cell at a time.
+    The grid gets a border of obstacles so each wave is just the frontier's flat
+    indices shifted by +-1 and +-width, masked by the boolean array of free cells not
+    reached yet and deduplicated; its cells get the wave number as their distance.
+    As with a BFS, 'source' itself may be an obstacle. Every wave costs a handful of
+    NumPy calls, so long corridors (mazes, with one wave per step and a tiny
+    frontier) are slower than a plain BFS; open and cluttered maps are far faster.
+    """
+    grid = as_grid_map(grid_costs)
+    rows, cols = grid.rows, grid.cols
+    width = cols + 2
+    unreached = np.zeros((rows + 2, width), dtype=bool)
+    unreached[1:-1, 1:-1] = ~grid.blocked.to_array()
+    unreached = unreached.reshape(-1)
+    distances = np.full(unreached.size, -1, dtype=np.int32)
+    claimed = np.zeros(unreached.size, dtype=np.intp)
+    shifts = np.array([1, width, -1, -width], dtype=np.intp)
+
+    frontier = np.array([(source[0] + 1) * width + source[1] + 1], dtype=np.intp)
+    unreached[frontier] = False
+    distances[frontier] = 0
+    wave = 0
+    while frontier.size:
+        wave += 1
+        neighbors = (frontier[:, None] + shifts).reshape(-1)
+        neighbors = neighbors[unreached[neighbors]]
+        # Several frontier cells may share a neighbour: keep the last writer of each cell
+        order = np.arange(neighbors.size)
+        claimed[neighbors] = order
+        frontier = neighbors[claimed[neighbors] == order]
+        unreached[frontier] = False
+        distances[frontier] = wave
+    return distances.reshape(rows + 2, width)[1:-1, 1:-1].reshape(-1)
+
+
+def descend_field(grid_costs, distances, start):
+    """
+    Gradient descent on a wavefront_field: from 'start', repeatedly steps to the
+    first neighbour (GridMap.neighbors order) one step closer, down to the field's
+    source. Returns the path as (row, col) tuples, or None if 'start' is unreachable.
+    """
+    grid = as_grid_map(grid_costs)
+    current = start[0] * grid.cols + start[1]
+    remaining = int(distances[current])
+    if remaining < 0:
+        return None
+    path = [current]
+    while remaining > 0:
+        remaining -= 1
+        current = next(n for n in grid.neighbors(current) if distances[n] == remaining)
+        path.append(current)
+    return [divmod(index, grid.cols) for index in path]
+
+
+def find_path_a_star(grid_costs, start, goal, bidirectional=False, stats=None, heuristic=None, backend="heap"):
+    """
+    Cheapest path (list of (row, col), None if unreachable) on 'grid_costs', a GridMap or 2-D cost array
+    where entering a cell costs its value; 'heuristic' is an optional flat array of consistent lower bounds.
+    bidirectional=True searches from both ends; backend is "heap", "bucket" (Dial, integer costs) or "auto".
+    """
+    if bidirectional:
+        if heuristic is not None:
+            raise ValueError("The bidirectional search only supports the Manhattan heuristic")
+        return bidirectional_a_star_search(grid_costs, start, goal, stats)[0]
+    if backend not in ("auto", "bucket", "heap"):
+        raise ValueError(f"Unknown backend: {backend}")
+    if backend != "heap":
+        started = perf_counter() if stats is not None else 0
+        grid = as_grid_map(grid_costs)
+        costs = integer_costs(grid)
+        if heuristic is not None and costs is not None:
+            bounds = np.asarray(heuristic)
+            finite = np.isfinite(bounds)
+            if np.all(bounds[finite] == np.floor(bounds[finite])):
+                heuristic = memoryview(np.where(finite, bounds, -1).astype(np.int64))
+            else:
+                costs = None
+        if costs is not None:
+            return dial_a_star_search(grid, start, goal, stats, heuristic, costs, started)[0]
+        if backend == "bucket":
+            raise ValueError(f"The bucket queue needs integer costs from 1 to {DIAL_MAX_COST} and an integer heuristic")
+        return a_star_search(grid, start, goal, stats, heuristic, started)[0]
+    return a_star_search(grid_costs, start, goal, stats, heuristic)[0]
+
+
+def a_star_search(grid_costs, start, goal, stats=None, heuristic=None, started=None):
+    """
+    find_path_a_star's unidirectional search; returns (path, expanded nodes).
+    'started', a perf_counter() reading, backdates the wall time reported to 'stats'.
+    """
+    if started is None:
+        started = perf_counter() if stats is not None else 0
+    grid = as_grid_map(grid_costs)
+    cols, size = grid.cols, grid.size
+    costs = grid.flat_costs()
+    blocked = grid.blocked.bits
+
+    start_index = start[0] * cols + start[1]
+    goal_index = goal[0] * cols + goal[1]
+    goal_r, goal_c = goal
+
+    g_score = array('d', [INF]) * size
+    came_from = array('q', [-1]) * size
+    closed = bytearray(size)
+
+    g_score[start_index] = 0
+    open_set = [(abs(start[0] - goal_r) + abs(start[1] - goal_c) if heuristic is None else heuristic[start_index],
+                 start_index)]
+    expanded = stale = peak = 0
+    path = None
+
+    while open_set:
+        _, current = heapq.heappop(open_set)
+        if closed[current]:
+            stale += 1
+            continue
+        if current == goal_index:
+            path = reconstruct_flat_path(came_from, start_index, goal_index, cols)
+            break
+        closed[current] = 1
+        expanded += 1
+        current_g = g_score[current]
+        for neighbor in grid.neighbors(current):
+            if closed[neighbor] or blocked[neighbor >> 3] >> (neighbor & 7) & 1:
+                continue
+            tentative_g_score = current_g + costs[neighbor]
+            if tentative_g_score < g_score[neighbor]:
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative_g_score
+                if heuristic is None:
+                    heapq.heappush(open_set, (tentative_g_score + abs(neighbor // cols - goal_r) + abs(neighbor % cols - goal_c), neighbor))
+                else:
+                    heapq.heappush(open_set, (tentative_g_score + heuristic[neighbor], neighbor))
+        if len(open_set) > peak:
+            peak = len(open_set)
+
+    if stats is not None:
+        # Every pop is a stale entry, an expansion or the goal; whatever was pushed is popped or still open
+        pops = stale + expanded + (path is not None)
+        stats.record(perf_counter() - started, expanded, pops + len(open_set), pops, stale, max(peak, 1))
+    return path, expanded
+
+
+def dial_a_star_search(grid_costs, start, goal, stats=None, heuristic=None, costs=None, started=None):
+    """
+    find_path_a_star's unidirectional search on a circular bucket queue (Dial's
+    algorithm) instead of a heap, for whole-number costs from 1 to DIAL_MAX_COST.
+    With a consistent integer heuristic f never decreases along the search and a
+    push is at most 2 * max cost above the f being expanded, so that many + 1
+    buckets indexed by f modulo their count hold the whole open set; pushes and pops
+    are list appends and pops with no tuple comparisons. 'costs' is the int64 view
+    from integer_costs and 'heuristic', if given, an int64 array with -1 for cells
+    that cannot reach the goal. 'started' is as in a_star_search. Returns (path, expanded nodes).
+    """
+    if started is None:
+        started = perf_counter() if stats is not None else 0
+    grid = as_grid_map(grid_costs)
+    cols, size = grid.cols, grid.size
+    if costs is None:
+        costs = integer_costs(grid)
+    blocked = grid.blocked.bits
+
+    start_index = start[0] * cols + start[1]
+    goal_index = goal[0] * cols + goal[1]
+    goal_r, goal_c = goal
+
+    g_score = array('q', [-1]) * size
+    came_from = array('q', [-1]) * size
+    closed = bytearray(size)
+    span = 2 * int(np.asarray(costs).max()) + 1
+    buckets = [[] for _ in range(span)]
+
+    g_score[start_index] = 0
+    f = abs(start[0] - goal_r) + abs(start[1] - goal_c) if heuristic is None else heuristic[start_index]
+    queued = 0
+    if f >= 0:
+        buckets[f % span].append(start_index)
+        queued = 1
+    expanded = stale = peak = 0
+    path = None
+
+    while queued:
+        bucket = buckets[f % span]
+        while not bucket:
+            f += 1
+            bucket = buckets[f % span]
+        current = bucket.pop()
+        queued -= 1
+        if closed[current]:
+            stale += 1
+            continue
+        if current == goal_index:
+            path = reconstruct_flat_path(came_from, start_index, goal_index, cols)
+            break
+        closed[current] = 1
+        expanded += 1
+        current_g = g_score[current]
+        for neighbor in grid.neighbors(current):
+            if closed[neighbor] or blocked[neighbor >> 3] >> (neighbor & 7) & 1:
+                continue
+            tentative_g_score = current_g + costs[neighbor]
+            if g_score[neighbor] < 0 or tentative_g_score < g_score[neighbor]:
+                if heuristic is None:
+                    estimate = abs(neighbor // cols - goal_r) + abs(neighbor % cols - goal_c)
+                else:
+                    estimate = heuristic[neighbor]
+                    if estimate < 0:
+                        continue
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative_g_score
+                buckets[(tentative_g_score + estimate) % span].append(neighbor)
+                queued += 1
+        if queued > peak:
+            peak = queued
+
+    if stats is not None:
+        pops = stale + expanded + (path is not None)
+        stats.record(perf_counter() - started, expanded, pops + queued, pops, stale, max(peak, 1))
+    return path, expanded
+
+
+def bidirectional_a_star_search(grid_costs, start, goal, stats=None):
+    """
+    Bidirectional A*: a forward search from 'start' and a backward search from 'goal'
+    over reversed edges (stepping back from a cell costs that cell's value).
+    Both use the average potential p(v) = (h_goal(v) - h_start(v)) / 2 of the two
+    Manhattan distances (forward keys g + p, backward keys g - p), which stays
+    consistent whenever each heuristic is, i.e. for every cost >= 1 as in
+    find_path_a_star. 'best' is the cheapest start-goal path through a cell both
+    searches have reached, and the search can stop as soon as the two lowest keys
+    add up to at least 'best'. The side with the smaller open set is expanded each round.
+    Returns (path, expanded nodes).
+    """
+    started = perf_counter() if stats is not None else 0
+    grid = as_grid_map(grid_costs)
+    cols, size = grid.cols, grid.size
+    costs = grid.flat_costs()
+    blocked = grid.blocked.bits
+
+    start_index = start[0] * cols + start[1]
+    goal_index = goal[0] * cols + goal[1]
+    if start_index == goal_index or blocked[goal_index >> 3] >> (goal_index & 7) & 1:
+        if stats is not None:
+            stats.record(perf_counter() - started)
+        return ([start] if start_index == goal_index else None), 0
+    start_r, start_c = start
+    goal_r, goal_c = goal
+
+    g_scores = (array('d', [INF]) * size, array('d', [INF]) * size)
+    came_froms = (array('q', [-1]) * size, array('q', [-1]) * size)
+    closeds = (bytearray(size), bytearray(size))
+    # The start is the one blocked cell a path may contain, so only the backward search may enter it
+    exempt = (-1, start_index)
+
+    g_scores[0][start_index] = 0
+    g_scores[1][goal_index] = 0
+    potential = (abs(start_r - goal_r) + abs(start_c - goal_c)) / 2
+    open_sets = ([(potential, start_index)], [(potential, goal_index)])
+    best, meeting = INF, -1
+    expanded = pushes = peak = 0
+
+    while open_sets[0] and open_sets[1]:
+        if open_sets[0][0][0] + open_sets[1][0][0] >= best:
+            break
+        side = 0 if len(open_sets[0]) <= len(open_sets[1]) else 1
+        open_set, g_score, came_from, closed = open_sets[side], g_scores[side], came_froms[side], closeds[side]
+        other_g_score = g_scores[1 - side]
+        sign = -0.5 if side else 0.5
+        _, current = heapq.heappop(open_set)
+        if closed[current]:
+            continue
+        closed[current] = 1
+        expanded += 1
+        current_g = g_score[current]
+        current_cost = costs[current]
+        for neighbor in grid.neighbors(current):
+            if closed[neighbor] or (blocked[neighbor >> 3] >> (neighbor & 7) & 1 and neighbor != exempt[side]):
+                continue
+            tentative_g_score = current_g + (current_cost if side else costs[neighbor])
+            if tentative_g_score < g_score[neighbor]:
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative_g_score
+                row, col = divmod(neighbor, cols)
+                potential = sign * (abs(row - goal_r) + abs(col - goal_c) - abs(row - start_r) - abs(col - start_c))
+                heapq.heappush(open_set, (tentative_g_score + potential, neighbor))
+                pushes += 1
+                if tentative_g_score + other_g_score[neighbor] < best:
+                    best, meeting = tentative_g_score + other_g_score[neighbor], neighbor
+        if len(open_sets[0]) + len(open_sets[1]) > peak:
+            peak = len(open_sets[0]) + len(open_sets[1])
+
+    path = None
+    if meeting >= 0:
+        path = reconstruct_flat_path(came_froms[0], start_index, meeting, cols)
+        current = meeting
+        while current != goal_index:
+            current = came_froms[1][current]
+            path.append(divmod(current, cols))
+    if stats is not None:
+        pops = pushes + 2 - len(open_sets[0]) - len(open_sets[1])
+        stats.record(perf_counter() - started, expanded, pushes + 2, pops, pops - expanded, max(peak, 2))
+    return path, expanded